@@ -0,0 +1,257 @@
+"""
+Streaming exceedance alerts on the live London Air feed. Sites are polled concurrently, each new hourly reading updates a
+fixed-size rolling window per site and species in O(1), and alerts fire when a reading or a rolling mean goes over its limit.
+An alert fires once when a limit is first exceeded and not again until the exceedance clears and the cool-down has passed.
+
+Usage: python alerting.py [--group London] [--interval 900] [--cooldown 21600] [--concurrency 16]
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import datetime
+import math
+import time
+
+#limits in ug/m3 based on the UK air quality objectives: 'threshold' applies to each hourly reading,
+#'rolling_limit' to the mean of the last 'window' hourly readings
+LIMITS = {
+    'NO2': {'threshold': 200.0, 'window': 24, 'rolling_limit': 100.0},
+    'PM10': {'threshold': None, 'window': 24, 'rolling_limit': 50.0},
+    'PM25': {'threshold': None, 'window': 24, 'rolling_limit': 25.0},
+    'O3': {'threshold': None, 'window': 8, 'rolling_limit': 100.0},
+    'SO2': {'threshold': 350.0, 'window': 24, 'rolling_limit': 125.0},
+}
+DEFAULT_COOLDOWN = 6 * 60 * 60
+POLL_INTERVAL = 15 * 60
+POLL_CONCURRENCY = 16
+
+
+class RollingWindow:
+    """
+    Mean of the last size hourly readings, updated in O(1) per reading with a ring buffer and a running sum.
+    Hours with no reading count towards the window but not the mean.
+
+    @param size: Number of hours in the window
+    """
+
+    __slots__ = ('size', 'values', 'total', 'count', 'last_hour')
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = collections.deque(maxlen = size)
+        self.total = 0.0
+        self.count = 0
+        self.last_hour = None
+
+    def push(self, hour: int, value: float) -> bool:
+        """
+        Adds the reading for an hour. Readings for hours already seen are ignored.
+
+        @param hour: Hours since the epoch of the reading
+        @param value: The reading, NaN if missing
+
+        @return: True if the reading was new
+        """
+
+        if self.last_hour is not None and hour <= self.last_hour:
+            return False
+        gap = 1 if self.last_hour is None else hour - self.last_hour
+        if gap > self.size:
+            self.values.clear()
+            self.total = 0.0
+            self.count = 0
+            gap = 1
+        #hours skipped since the last reading enter the window as missing
+        for _ in range(gap - 1):
+            self._append(math.nan)
+        self._append(value)
+        self.last_hour = hour
+        return True
+
+    def _append(self, value: float) -> None:
+        if len(self.values) == self.size:
+            evicted = self.values[0]
+            if not math.isnan(evicted):
+                self.total -= evicted
+                self.count -= 1
+        self.values.append(value)
+        if not math.isnan(value):
+            self.total += value
+            self.count += 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else math.nan
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size
+
+
+class AlertEngine:
+    """
+    Keeps a rolling window per site and species and decides when to alert
+
+    @param limits: Limits per species code, as in LIMITS
+    @param cooldown: Minimum seconds between two alerts of the same kind for the same site and species
+    @param on_alert: Called with each alert dict, defaults to printing it
+    """
+
+    def __init__(self, limits = LIMITS, cooldown = DEFAULT_COOLDOWN, on_alert = None):
+        self.limits = limits
+        self.cooldown = cooldown
+        self.on_alert = on_alert or print_alert
+        self.windows = {}
+        self.last_measured = {}
+        self.active = set()
+        self.last_fired = {}
+
+    def update(self, site_code: str, species_code: str, measured_at: str, value: float, now = None) -> list[dict]:
+        """
+        Feeds one reading through the site and species' window and checks its limits
+
+        @param site_code: Code of the monitoring site
+        @param species_code: Code of the pollutant
+        @param measured_at: MeasurementDateGMT of the reading, 'YYYY-MM-DD HH:MM:SS'
+        @param value: The reading, NaN if missing. Missing readings are ignored.
+        @param now: Current time in seconds since the epoch, for the cool-down. Defaults to time.time()
+
+        @return: Alerts fired by this reading
+        """
+
+        limits = self.limits.get(species_code)
+        if limits is None:
+            return []
+        key = (site_code, species_code)
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = RollingWindow(limits['window'])
+        #timestamps are ISO formatted, so readings already seen are skipped with a string comparison before any parsing
+        if measured_at <= self.last_measured.get(key, ''):
+            return []
+        #today's hours not yet measured are listed with no value. They must not move last_measured on, or their readings
+        #would be skipped when they arrive. Hours that stay missing enter the window as a gap when a later reading comes.
+        if math.isnan(value):
+            return []
+        self.last_measured[key] = measured_at
+        hour = int(datetime.datetime.fromisoformat(measured_at).replace(tzinfo = datetime.timezone.utc).timestamp()) // 3600
+        window.push(hour, value)
+
+        now = time.time() if now is None else now
+        checks = (('threshold', value, limits['threshold']), ('rolling_mean', window.mean if window.full else math.nan, limits['rolling_limit']))
+        alerts = []
+        for kind, level, limit in checks:
+            alert_key = key + (kind,)
+            if limit is None or math.isnan(level) or level <= limit:
+                self.active.discard(alert_key)
+                continue
+            if alert_key in self.active or now - self.last_fired.get(alert_key, -math.inf) < self.cooldown:
+                self.active.add(alert_key)
+                continue
+            self.active.add(alert_key)
+            self.last_fired[alert_key] = now
+            alert = {'site_code': site_code, 'species_code': species_code, 'kind': kind, 'measured_at': measured_at, 'value': round(level, 2), 'limit': limit}
+            self.on_alert(alert)
+            alerts.append(alert)
+        return alerts
+
+    def update_payload(self, site_code: str, payload: dict) -> list[dict]:
+        """
+        Feeds the new readings of a /Data/Site/ payload through update(), in time order
+
+        @return: Alerts fired
+        """
+
+        try:
+            readings = payload['AirQualityData']['Data']
+        except (KeyError, TypeError):
+            return []
+        readings = [readings] if isinstance(readings, dict) else readings
+        last_measured = self.last_measured
+        readings = [reading for reading in readings if reading['@MeasurementDateGMT'] > last_measured.get((site_code, reading['@SpeciesCode']), '')]
+        alerts = []
+        for reading in sorted(readings, key = lambda reading: reading['@MeasurementDateGMT']):
+            try:
+                value = float(reading['@Value'])
+            except (KeyError, ValueError):
+                value = math.nan
+            alerts += self.update(site_code, reading['@SpeciesCode'], reading['@MeasurementDateGMT'], math.nan if value < 0 else value)
+        return alerts
+
+
+def print_alert(alert: dict) -> None:
+    print('ALERT ' + alert['measured_at'] + ' ' + alert['site_code'] + ' ' + alert['species_code'] + ': ' +
+    ('hourly reading ' if alert['kind'] == 'threshold' else 'rolling mean ') + str(alert['value']) + ' is over the limit of ' + str(alert['limit']), flush = True)
+
+
+def poll_sites(engine: AlertEngine, site_codes: list[str], max_concurrency = POLL_CONCURRENCY) -> tuple[list[dict], list[str]]:
+    """
+    Fetches today's and yesterday's readings of every site concurrently and feeds them to the alert engine.
+    Readings already seen are skipped in O(1), so the work per cycle is bounded by the number of new readings.
+
+    @param engine: The alert engine holding each site's state
+    @param site_codes: Codes of the sites to poll
+    @param max_concurrency: The maximum number of requests in flight at once
+
+    @return: Alerts fired, and site codes that could not be fetched
+    """
+
+    import monitoring
+
+    start_date = datetime.date.today() - datetime.timedelta(days = 1)
+    alerts = []
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers = max(1, max_concurrency)) as executor:
+        futures = {executor.submit(monitoring.get_live_data_from_api, '/Data/Site/SiteCode={site_code}/StartDate={start_date}/EndDate={end_date}/json',
+        site_code = site_code, start_date = start_date, end_date = start_date + datetime.timedelta(days = 2), retries = 1): site_code for site_code in site_codes}
+        #results are fed to the engine on this thread only, so it needs no locking
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                alerts += engine.update_payload(futures[future], future.result())
+            except Exception:
+                failed.append(futures[future])
+    return alerts, sorted(failed)
+
+
+def run_alerting(group_name = 'London', interval = POLL_INTERVAL, cooldown = DEFAULT_COOLDOWN, max_concurrency = POLL_CONCURRENCY, cycles = None) -> None:
+    """
+    Polls every operating site in a group forever (or for a number of cycles), printing alerts as they fire
+
+    @param group_name: The name of a group of pollution monitoring sites
+    @param interval: Seconds between the start of each poll
+    @param cooldown: Minimum seconds between repeated alerts
+    @param max_concurrency: The maximum number of requests in flight at once
+    @param cycles: Number of polls to run, or None to run until interrupted
+    """
+
+    import monitoring
+
+    engine = AlertEngine(cooldown = cooldown)
+    sites = monitoring.unpack_json(monitoring.get_live_data_from_api('/Information/MonitoringSites/GroupName={group_name}/Json', group_name = group_name), ['Sites', 'Site'])
+    site_codes = [] if sites is None else list(sites.loc[sites['DateClosed'] == '']['SiteCode'])
+    print('Watching ' + str(len(site_codes)) + ' sites in ' + group_name + ', polling every ' + str(interval) + 's', flush = True)
+    cycle = 0
+    while cycles is None or cycle < cycles:
+        poll_start = time.perf_counter()
+        alerts, failed = poll_sites(engine, site_codes, max_concurrency)
+        poll_time = time.perf_counter() - poll_start
+        print(str(datetime.datetime.now())[:19] + ' polled ' + str(len(site_codes) - len(failed)) + '/' + str(len(site_codes)) + ' sites in ' +
+        str(round(poll_time, 2)) + 's, ' + str(len(alerts)) + ' alerts' + (' (failed: ' + ', '.join(failed) + ')' if failed else ''), flush = True)
+        cycle += 1
+        if cycles is None or cycle < cycles:
+            time.sleep(max(0.0, interval - poll_time))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Alert on pollution limit exceedances in the live London Air feed')
+    parser.add_argument('--group', default = 'London')
+    parser.add_argument('--interval', type = float, default = POLL_INTERVAL, help = 'seconds between polls')
+    parser.add_argument('--cooldown', type = float, default = DEFAULT_COOLDOWN, help = 'minimum seconds between repeated alerts')
+    parser.add_argument('--concurrency', type = int, default = POLL_CONCURRENCY)
+    parser.add_argument('--cycles', type = int, default = None, help = 'stop after this many polls')
+    args = parser.parse_args()
+    try:
+        run_alerting(args.group, args.interval, args.cooldown, args.concurrency, args.cycles)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,108 @@
+"""
+Benchmarks the alerting engine on many sites. Payloads for two days of readings are generated with the replay server's
+generator, then each poll cycle moves the two day span on by an hour, as a live feed does. Reports the time per cycle and
+the approximate memory held by the engine's state, which should both stay flat as cycles go by. First checks that an hour
+listed with no value on one poll still alerts when its reading arrives on the next.
+
+Usage: python bench_alerting.py [--sites 500] [--cycles 48]
+Exits with status 1 if the check fails.
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import alerting
+import replay_server
+
+RECORDED_SITES = ('MY1', 'KC1', 'LH2', 'BL0', 'CD1', 'GR4', 'HG4', 'TH4', 'WM6', 'EI1')
+
+
+def build_payloads(start: datetime.datetime, sites: int, days: int) -> dict:
+    """
+    Builds /Data/Site/ payloads covering days from start, keyed by recorded site code
+    """
+
+    end = start + datetime.timedelta(days = days)
+    return {site_code: replay_server.build_response('/Data/Site/SiteCode=' + site_code + '/StartDate=' + str(start.date()) + '/EndDate=' + str(end.date()) + '/json')
+    for site_code in RECORDED_SITES}
+
+
+def window_payloads(payloads: dict, start: datetime.datetime, sites: int) -> dict:
+    """
+    Cuts two days of readings from start out of each payload, keyed by site code. Sites beyond the recorded ones reuse their readings.
+    """
+
+    first, last = str(start), str(start + datetime.timedelta(days = 2))
+    windows = {site_code: {'AirQualityData': {'@SiteCode': site_code, 'Data': [reading for reading in payload['AirQualityData']['Data']
+    if first <= reading['@MeasurementDateGMT'] < last]}} for site_code, payload in payloads.items()}
+    return {RECORDED_SITES[n % len(RECORDED_SITES)] + '-' + str(n): windows[RECORDED_SITES[n % len(RECORDED_SITES)]] for n in range(sites)}
+
+
+def state_size(engine: alerting.AlertEngine) -> int:
+    """
+    Approximate bytes held by the engine's windows and alert state
+    """
+
+    size = sum(sys.getsizeof(window.values) + 8 * len(window.values) for window in engine.windows.values())
+    for container in (engine.windows, engine.last_measured, engine.active, engine.last_fired):
+        size += sys.getsizeof(container)
+    return size
+
+
+def day_payload(values: dict) -> dict:
+    """
+    Builds a /Data/Site/ payload of NO2 readings for every hour of 2021-01-01, hours not in values listed with no value
+    """
+
+    return {'AirQualityData': {'@SiteCode': 'MY1', 'Data': [{'@SpeciesCode': 'NO2', '@MeasurementDateGMT': '2021-01-01 ' + str(hour).zfill(2) + ':00:00',
+    '@Value': str(values[hour]) if hour in values else ''} for hour in range(24)]}}
+
+
+def check_late_reading() -> bool:
+    """
+    Polls twice: hours 10 onwards are empty on the first poll, and hour 10 is over the threshold on the second
+    """
+
+    alerts = []
+    engine = alerting.AlertEngine(on_alert = alerts.append)
+    first = engine.update_payload('MY1', day_payload({hour: 40.0 for hour in range(10)}))
+    second = engine.update_payload('MY1', day_payload({hour: 400.0 if hour == 10 else 40.0 for hour in range(11)}))
+    return first == [] and [(alert['kind'], alert['measured_at']) for alert in second] == [('threshold', '2021-01-01 10:00:00')]
+
+
+def main(sites: int, cycles: int) -> int:
+    if not check_late_reading():
+        print('FAIL a reading arriving after its hour was listed empty did not alert')
+        return 1
+    print('Late reading check passed')
+    alerts = []
+    engine = alerting.AlertEngine(on_alert = alerts.append)
+    start = datetime.datetime(2021, 1, 1)
+    source = build_payloads(start, sites, 3 + cycles // 24)
+    for cycle in range(cycles + 1):
+        payloads = window_payloads(source, start + datetime.timedelta(hours = cycle), sites)
+        before = len(alerts)
+        cycle_start = time.perf_counter()
+        for site_code, payload in payloads.items():
+            engine.update_payload(site_code, payload)
+        seconds = time.perf_counter() - cycle_start
+        del payloads
+        if cycle == 0 or cycle % max(1, cycles // 8) == 0 or cycle == cycles:
+            memory = state_size(engine)
+            print(('first poll' if cycle == 0 else 'cycle ' + str(cycle)).ljust(12) + str(round(seconds * 1000, 1)).rjust(9) + ' ms' +
+            str(len(alerts) - before).rjust(8) + ' alerts' + str(round(memory / 2**10)).rjust(8) + ' KiB held')
+    print(str(sites) + ' sites, ' + str(len(engine.windows)) + ' site/species windows, ' + str(len(alerts)) + ' alerts in total')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Benchmark the alerting engine')
+    parser.add_argument('--sites', type = int, default = 500)
+    parser.add_argument('--cycles', type = int, default = 48)
+    args = parser.parse_args()
+    sys.exit(main(args.sites, args.cycles))
@@ -0,0 +1,70 @@
+"""
+Benchmarks the reporting statistics cube: the time to build it from the loaded csv data, to save it and to load it,
+against the time saved per query by slicing it instead of computing the statistic with the reporting.py function.
+Every cube answer is also checked against the reporting.py function.
+
+Usage: python bench_cube.py
+Exits with status 1 if any answer differs.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import cube
+import reporting
+
+QUERIES = ('daily_average', 'daily_median', 'hourly_average', 'monthly_average', 'count_missing_data')
+DATES = ('2021-01-01', '2021-03-28', '2021-07-15', '2021-10-31', '2021-12-31')
+
+
+def timed(function) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main() -> int:
+    load_time, data = timed(lambda: reporting.load_data())
+    build_time, statistics_cube = timed(lambda: cube.build_cube(data))
+    path = os.path.join(tempfile.mkdtemp(), 'cube.npz')
+    save_time, _ = timed(lambda: cube.save_cube(statistics_cube, path))
+    cube_load_time, loaded = timed(lambda: cube.load_cube(path = path))
+    print('load csv files'.ljust(24) + str(round(load_time * 1000, 1)).rjust(9) + ' ms')
+    print('build cube'.ljust(24) + str(round(build_time * 1000, 1)).rjust(9) + ' ms')
+    print('save cube'.ljust(24) + str(round(save_time * 1000, 1)).rjust(9) + ' ms (' + str(os.path.getsize(path) // 1024) + ' KiB)')
+    print('load saved cube'.ljust(24) + str(round(cube_load_time * 1000, 1)).rjust(9) + ' ms')
+
+    failures = 0
+    function_time = 0.0
+    cube_time = 0.0
+    queries = 0
+    for station in reporting.STATIONS:
+        for pollutant in reporting.POLLUTANTS:
+            for statistic in QUERIES + ('peak_hour_date',):
+                for date in (DATES if statistic == 'peak_hour_date' else (None,)):
+                    arguments = (data, date, station, pollutant) if date else (data, station, pollutant)
+                    seconds, expected = timed(lambda: getattr(reporting, statistic)(*arguments))
+                    function_time += seconds
+                    seconds, answer = timed(lambda: loaded.answer(statistic, station, pollutant, date))
+                    cube_time += seconds
+                    queries += 1
+                    if not np.allclose(np.asarray(answer, dtype = float), np.asarray(expected, dtype = float), equal_nan = True):
+                        print('FAIL ' + statistic + ' ' + station + ' ' + pollutant + ' ' + str(date))
+                        failures += 1
+
+    saving = (function_time - cube_time) / queries
+    print('\n' + str(queries) + ' queries')
+    print('reporting.py'.ljust(24) + str(round(function_time / queries * 1000, 3)).rjust(9) + ' ms per query')
+    print('cube'.ljust(24) + str(round(cube_time / queries * 1000, 3)).rjust(9) + ' ms per query')
+    print('build pays for itself after ' + str(int(np.ceil(build_time / saving))) + ' queries, a saved cube after ' + str(int(np.ceil(cube_load_time / saving))))
+    print('All answers match' if failures == 0 else str(failures) + ' answers differ')
+    return 0 if failures == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Benchmarks decoding of /Data/SiteSpecies payloads: the old per-row strptime path against monitoring.decode_readings(),
+and the standard library json parser against orjson (if installed).
+
+Usage: python bench_decode.py [payload.json ...]
+Each payload should be a recorded /Data/SiteSpecies response. Without arguments a year of hourly readings is generated.
+"""
+
+import datetime
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import monitoring
+
+
+def generate_payload(hours = 24 * 365) -> dict:
+    """
+    Generates a /Data/SiteSpecies style payload of hourly readings, with some empty and negative values
+    """
+
+    start = datetime.datetime(2021, 1, 1)
+    readings = []
+    for hour in range(hours):
+        roll = random.random()
+        value = '' if roll < 0.05 else str(round(-1.0 if roll < 0.06 else random.uniform(0, 120), 1))
+        readings.append({'@MeasurementDateGMT': str(start + datetime.timedelta(hours = hour)), '@Value': value})
+    return {'RawAQData': {'@SiteCode': 'MY1', '@SpeciesCode': 'NO2', 'Data': readings}}
+
+
+def decode_per_row(data):
+    x_values = list(map(lambda value: datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S'), data['MeasurementDateGMT']))
+    y_values = data['Value'].replace('', np.nan).to_numpy(dtype = float)
+    y_values[y_values < 0] = np.nan
+    return x_values, y_values
+
+
+def bench(label: str, function, repeat = 5) -> float:
+    best = min(timeit.repeat(function, number = 1, repeat = repeat))
+    print(label.ljust(40) + str(round(best * 1000, 2)).rjust(10) + ' ms')
+    return best
+
+
+def main(paths: list[str]) -> None:
+    payloads = [open(path, 'rb').read() for path in paths] or [json.dumps(generate_payload()).encode()]
+    for number, content in enumerate(payloads, start = 1):
+        data = monitoring.unpack_json(json.loads(content), ['RawAQData', 'Data'])
+        print('\nPayload ' + str(number) + ': ' + str(len(data)) + ' readings, ' + str(len(content) // 1024) + ' KiB')
+        bench('json.loads', lambda: json.loads(content))
+        if monitoring.fast_json is not None:
+            bench('orjson.loads', lambda: monitoring.fast_json.loads(content))
+        bench('unpack_json', lambda: monitoring.unpack_json(json.loads(content), ['RawAQData', 'Data']))
+        old = bench('strptime per row', lambda: decode_per_row(data))
+        new = bench('decode_readings', lambda: monitoring.decode_readings(data['MeasurementDateGMT'], data['Value']))
+        print('decode speed-up: ' + str(round(old / new, 1)) + 'x')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,95 @@
+"""
+End-to-end benchmark of monitoring.py against replay_server.py under simulated network conditions.
+Measures dashboard refresh latency, group dashboard refresh time, graph-data fetch throughput and request counts.
+The response cache and time-series store are redirected to a temporary directory so real caches are untouched.
+
+Usage: python bench_monitoring.py [--latency 0.08] [--jitter 0.04] [--error-rate 0.02] [--refreshes 20] [--days 365]
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache
+import monitoring
+import replay_server
+import store
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[int(fraction * (len(values) - 1))]
+
+
+def report(label: str, values: list[float]) -> None:
+    print(label.ljust(34) + 'mean ' + str(round(1000 * sum(values) / len(values), 1)).rjust(8) + ' ms   p95 ' +
+    str(round(1000 * percentile(values, 0.95), 1)).rjust(8) + ' ms')
+
+
+def main(args) -> None:
+    temp_dir = tempfile.mkdtemp()
+    cache.CACHE_DIR = os.path.join(temp_dir, 'cache')
+    store.STORE_PATH = os.path.join(temp_dir, 'timeseries.sqlite')
+    server = replay_server.ReplayServer(latency = args.latency, jitter = args.jitter, error_rate = args.error_rate, seed = 0).start()
+    monitoring.set_api_url(server.url)
+    monitoring.API_BACKOFF = 0.05
+    print('Replay server at ' + server.url + ' (latency ' + str(args.latency) + 's +/- ' + str(args.jitter) + 's, error rate ' + str(args.error_rate) + ')\n')
+
+    refreshes = []
+    previous = None
+    for _ in range(args.refreshes):
+        start = time.perf_counter()
+        previous = monitoring.get_dashboard_data('MY1')
+        refreshes.append(time.perf_counter() - start)
+    report('dashboard refresh', refreshes)
+    report('dashboard refresh (warm cache)', refreshes[1:] or refreshes)
+
+    conditional = []
+    for _ in range(args.refreshes):
+        start = time.perf_counter()
+        previous = monitoring.get_dashboard_data('MY1', previous = previous)
+        conditional.append(time.perf_counter() - start)
+    report('live refresh (unchanged bulletin)', conditional)
+
+    group = []
+    for _ in range(3):
+        start = time.perf_counter()
+        rows, timed_out, failed = monitoring.get_group_dashboard_data('London')
+        group.append(time.perf_counter() - start)
+    report('group dashboard (' + str(len(rows)) + ' sites)', group)
+
+    end_date = datetime.date(2022, 1, 1)
+    start_date = end_date - datetime.timedelta(days = args.days)
+    start = time.perf_counter()
+    data, failed_windows = monitoring.fetch_site_species('MY1', 'NO2', start_date, end_date, show_progress = False)
+    elapsed = time.perf_counter() - start
+    print('graph data, chunked download'.ljust(34) + str(len(data)) + ' readings in ' + str(round(elapsed, 2)) + ' s (' +
+    str(round(len(data) / elapsed)) + ' readings/s, ' + str(len(failed_windows)) + ' failed windows)')
+
+    for label in ('graph data, store cold', 'graph data, store warm'):
+        start = time.perf_counter()
+        data, failed_windows = monitoring.get_stored_site_species('KC1', 'NO2', start_date, end_date)
+        elapsed = time.perf_counter() - start
+        print(label.ljust(34) + str(len(data)) + ' readings in ' + str(round(elapsed, 3)) + ' s')
+
+    print('\nClient: ' + ', '.join([key + ' ' + str(value if not isinstance(value, float) else round(value * 1000, 1)) 
+    for key, value in monitoring.get_request_stats().items()]) + ' (latencies in ms)')
+    print('Server requests by endpoint:')
+    for endpoint, count in sorted(server.request_counts.items()):
+        print('    ' + endpoint.ljust(40) + str(count))
+    server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Benchmark monitoring.py against a local replay server')
+    parser.add_argument('--latency', type = float, default = 0.08)
+    parser.add_argument('--jitter', type = float, default = 0.04)
+    parser.add_argument('--error-rate', type = float, default = 0.02)
+    parser.add_argument('--refreshes', type = int, default = 20)
+    parser.add_argument('--days', type = int, default = 365)
+    main(parser.parse_args())
@@ -0,0 +1,65 @@
+"""
+Benchmarks drawing long multi-site graphs with matplotlib's Agg backend, at full resolution and after
+monitoring.decimate_minmax(). The default is 10 sites x 5 years of hourly readings.
+
+Usage: python bench_render.py [--sites 10] [--years 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import monitoring
+
+
+def generate_series(sites: int, years: int) -> list[tuple[np.ndarray, np.ndarray]]:
+    generator = np.random.default_rng(0)
+    x_values = np.arange(np.datetime64('2017-01-01T00:00:00'), np.datetime64(str(2017 + years) + '-01-01T00:00:00'), np.timedelta64(1, 'h'))
+    series = []
+    for _ in range(sites):
+        y_values = 40 + 20 * np.sin(np.arange(len(x_values)) * 2 * np.pi / 24) + generator.normal(0, 8, len(x_values))
+        y_values[generator.random(len(x_values)) < 0.05] = np.nan
+        series.append((x_values, y_values))
+    return series
+
+
+def draw(series: list, decimate: bool) -> float:
+    figure, axes = plt.subplots(figsize = (12, 6))
+    start = time.perf_counter()
+    for x_values, y_values in series:
+        if decimate:
+            x_values, y_values = monitoring.decimate_minmax(x_values, y_values, x_values[0], x_values[-1], axes.bbox.width)
+        axes.plot(x_values, y_values, marker = 'o', markersize = 2, linestyle = '')
+    figure.canvas.draw()
+    elapsed = time.perf_counter() - start
+    plt.close(figure)
+    return elapsed
+
+
+def main(args) -> None:
+    series = generate_series(args.sites, args.years)
+    print(str(args.sites) + ' sites x ' + str(len(series[0][0])) + ' hourly readings')
+    full = draw(series, decimate = False)
+    decimated = draw(series, decimate = True)
+    print('full resolution draw'.ljust(28) + str(round(full, 3)).rjust(8) + ' s')
+    print('decimated draw'.ljust(28) + str(round(decimated, 3)).rjust(8) + ' s')
+
+    x_values, y_values = series[0]
+    start = time.perf_counter()
+    for zoom in range(1, 21):
+        monitoring.decimate_minmax(x_values, y_values, x_values[0], x_values[len(x_values) // zoom - 1], 960)
+    print('re-decimate on zoom'.ljust(28) + str(round((time.perf_counter() - start) / 20 * 1000, 2)).rjust(8) + ' ms per series')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Benchmark graph rendering with and without decimation')
+    parser.add_argument('--sites', type = int, default = 10)
+    parser.add_argument('--years', type = int, default = 5)
+    main(parser.parse_args())
@@ -0,0 +1,179 @@
+"""
+Checks and benchmarks resampling.py. Every frequency and statistic is checked against a naive reference (a Python dict of
+lists per bucket, built with datetime arithmetic) on deliberately gappy data: several years including a leap year, rows
+dropped at random, whole days and a month missing, clock-change style duplicate and skipped hours, and NaN values.
+The reporting functions are then checked against the old row-slicing versions on the station csv files, which have no
+missing rows, and both are timed.
+
+Usage: python bench_resampling.py [--years 3] [--seed 0]
+Exits with status 1 if any check fails.
+"""
+
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import reporting
+import resampling
+
+
+def gappy_series(years: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Generates hour-ending timestamps and values from 2020 (a leap year) with gaps, duplicates and NaN values, shuffled
+    """
+
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2020-01-01T01', 'h')
+    timestamps = start + np.arange(24 * 366 * years).astype('timedelta64[h]')
+    keep = rng.random(len(timestamps)) > 0.1
+    #a missing month and some missing days
+    keep &= ~((timestamps >= np.datetime64('2020-06-01T01')) & (timestamps <= np.datetime64('2020-07-01T00')))
+    for day in rng.integers(0, 366 * years, 20):
+        keep[day * 24:(day + 1) * 24] = False
+    timestamps = timestamps[keep]
+    #a clock change style repeated hour
+    timestamps = np.concatenate([timestamps, timestamps[rng.integers(0, len(timestamps), 10)]])
+    values = rng.gamma(2.0, 20.0, len(timestamps))
+    values[rng.random(len(values)) < 0.15] = np.nan
+    order = rng.permutation(len(timestamps))
+    return timestamps[order], values[order]
+
+
+def naive_key(timestamp: datetime.datetime, frequency: str):
+    hour = timestamp - datetime.timedelta(hours = 1)
+    if frequency == 'hourly':
+        return hour
+    if frequency == 'daily':
+        return hour.date()
+    if frequency == 'weekly':
+        return hour.date() - datetime.timedelta(days = hour.weekday())
+    if frequency == 'monthly':
+        return (hour.year, hour.month)
+    if frequency == 'quarterly':
+        return (hour.year, (hour.month - 1) // 3)
+    if frequency == 'yearly':
+        return hour.year
+    return hour.hour
+
+
+def naive_next(key, frequency: str):
+    if frequency == 'hourly':
+        return key + datetime.timedelta(hours = 1)
+    if frequency == 'daily':
+        return key + datetime.timedelta(days = 1)
+    if frequency == 'weekly':
+        return key + datetime.timedelta(days = 7)
+    if frequency == 'monthly':
+        return (key[0] + key[1] // 12, key[1] % 12 + 1)
+    if frequency == 'quarterly':
+        return (key[0] + (key[1] + 1) // 4, (key[1] + 1) % 4)
+    if frequency == 'yearly':
+        return key + 1
+    return key + 1
+
+
+def naive_resample(timestamps: np.ndarray, values: np.ndarray, frequency: str, statistic: str) -> list[float]:
+    groups = {}
+    for timestamp, value in zip(timestamps.astype(datetime.datetime), values):
+        groups.setdefault(naive_key(timestamp, frequency), []).append(value)
+    key, last = (0, 23) if frequency == 'hour_of_day' else (min(groups), max(groups))
+    results = []
+    while key <= last:
+        group = groups.get(key, [])
+        present = [value for value in group if not np.isnan(value)]
+        if statistic == 'missing':
+            results.append(len(group) - len(present))
+        elif statistic == 'count':
+            results.append(len(present))
+        elif statistic == 'sum':
+            results.append(sum(present))
+        elif len(present) == 0:
+            results.append(np.nan)
+        else:
+            results.append({'mean': statistics.fmean, 'median': statistics.median, 'max': max, 'min': min}[statistic](present))
+        key = naive_next(key, frequency)
+    return results
+
+
+def old_daily_average(data, station, pollutant):
+    averages = []
+    for day in [data[station][pollutant][x:x+24] for x in range(0, len(data[station][pollutant]), 24)]:
+        day = day[~np.isnan(day)]
+        averages.append(np.nan if len(day) == 0 else sum(day) / len(day))
+    return averages
+
+
+def old_daily_median(data, station, pollutant):
+    medians = []
+    for day in [data[station][pollutant][x:x+24] for x in range(0, len(data[station][pollutant]), 24)]:
+        day = day[~np.isnan(day)]
+        medians.append(np.nan if len(day) == 0 else np.median(list(day)))
+    return medians
+
+
+def old_hourly_average(data, station, pollutant):
+    averages = []
+    for hour in [data[station][pollutant][x::24] for x in range(24)]:
+        hour = hour[~np.isnan(hour)]
+        averages.append(np.nan if len(hour) == 0 else sum(hour) / len(hour))
+    return averages
+
+
+def old_monthly_average(data, station, pollutant):
+    months_start = data[station]['date'].str[5:7]
+    months_start = months_start.eq(months_start.shift())
+    months_start = [index for index, value in enumerate(months_start) if not value] + [None]
+    averages = []
+    for month in [data[station][pollutant][start:end] for start, end in zip(months_start, months_start[1:])]:
+        month = month[~np.isnan(month)]
+        averages.append(np.nan if len(month) == 0 else sum(month) / len(month))
+    return averages
+
+
+def same(first, second) -> bool:
+    first, second = np.asarray(first, dtype = float), np.asarray(second, dtype = float)
+    return first.shape == second.shape and bool(np.allclose(first, second, equal_nan = True))
+
+
+def main(years: int, seed: int) -> int:
+    failures = 0
+    timestamps, values = gappy_series(years, seed)
+    print('Gappy data: ' + str(len(values)) + ' readings over ' + str(years) + ' years, ' + str(int(np.isnan(values).sum())) + ' NaN')
+    for frequency in resampling.FREQUENCIES:
+        starts, results = resampling.resample_many(timestamps, values, frequency)
+        for statistic in resampling.STATISTICS:
+            if not same(results[statistic], naive_resample(timestamps, values, frequency, statistic)):
+                print('FAIL ' + frequency + ' ' + statistic)
+                failures += 1
+        print(frequency.ljust(12) + str(len(starts)).rjust(6) + ' buckets from ' + str(starts[0]))
+
+    data = reporting.load_data()
+    print('\nStation data (' + str(len(data[reporting.STATIONS[0]])) + ' rows per station)')
+    functions = ((old_daily_average, reporting.daily_average), (old_daily_median, reporting.daily_median),
+    (old_hourly_average, reporting.hourly_average), (old_monthly_average, reporting.monthly_average))
+    for old, new in functions:
+        for station in reporting.STATIONS:
+            for pollutant in reporting.POLLUTANTS:
+                if not same(old(data, station, pollutant), new(data, station, pollutant)):
+                    print('FAIL ' + new.__name__ + ' ' + station + ' ' + pollutant)
+                    failures += 1
+        old_time = min(timeit.repeat(lambda: old(data, 'Marylebone Road', 'no'), number = 1, repeat = 3))
+        new_time = min(timeit.repeat(lambda: new(data, 'Marylebone Road', 'no'), number = 1, repeat = 3))
+        print(new.__name__.ljust(18) + str(round(old_time * 1000, 2)).rjust(10) + ' ms ->' + str(round(new_time * 1000, 2)).rjust(8) + ' ms')
+
+    print('\n' + ('All checks passed' if failures == 0 else str(failures) + ' checks failed'))
+    return 0 if failures == 0 else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Check and benchmark resampling.py')
+    parser.add_argument('--years', type = int, default = 3)
+    parser.add_argument('--seed', type = int, default = 0)
+    args = parser.parse_args()
+    sys.exit(main(args.years, args.seed))
@@ -0,0 +1,82 @@
+"""
+Load test of server.py. Starts a server in-process and drives it from concurrent keep-alive clients for a fixed time,
+then reports sustained requests per second, latency percentiles and how many queries were coalesced.
+
+Usage: python bench_server.py [--clients 16] [--duration 10] [--components]
+--components adds connected component queries to the mix (slow, they run the pure Python pixel loops).
+"""
+
+import argparse
+import http.client
+import itertools
+import os
+import sys
+import threading
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reporting
+import server
+
+STATISTICS = ('daily_average', 'daily_median', 'hourly_average', 'monthly_average', 'count_missing_data')
+
+
+def build_queries(components: bool) -> list[str]:
+    queries = ['/report/' + statistic + '?' + urllib.parse.urlencode({'station': station, 'pollutant': pollutant})
+    for statistic, station, pollutant in itertools.product(STATISTICS, reporting.STATIONS, reporting.POLLUTANTS)]
+    queries += ['/report/peak_hour_date?' + urllib.parse.urlencode({'station': 'Harlington', 'pollutant': 'no', 'date': '2021-0' + str(month) + '-01'}) for month in range(1, 10)]
+    if components:
+        queries += ['/intelligence/components?colour=red', '/intelligence/components?colour=cyan']
+    return queries
+
+
+def client(port: int, queries: list[str], offset: int, deadline: float, latencies: list[float], errors: list[int]) -> None:
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    for query in itertools.islice(itertools.cycle(queries), offset, None):
+        if time.perf_counter() > deadline:
+            break
+        start = time.perf_counter()
+        connection.request('GET', query)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            errors.append(response.status)
+    connection.close()
+
+
+def main(args) -> None:
+    query_server = server.QueryServer(port = 0)
+    threading.Thread(target = query_server.serve_forever, daemon = True).start()
+    port = query_server.server_address[1]
+    queries = build_queries(args.components)
+
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    clients = [threading.Thread(target = client, args = (port, queries, number * 7, deadline, latencies, errors)) for number in range(args.clients)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    query_server.shutdown()
+    query_server.server_close()
+
+    latencies.sort()
+    percentile = lambda fraction: round(1000 * latencies[int(fraction * (len(latencies) - 1))], 2)
+    print(str(args.clients) + ' clients, ' + str(len(queries)) + ' distinct queries, ' + str(round(elapsed, 1)) + ' s')
+    print('requests'.ljust(16) + str(len(latencies)) + ' (' + str(len(errors)) + ' errors, ' + str(query_server.coalesced) + ' coalesced)')
+    print('throughput'.ljust(16) + str(round(len(latencies) / elapsed, 1)) + ' requests/s')
+    print('latency'.ljust(16) + 'p50 ' + str(percentile(0.5)) + ' ms   p99 ' + str(percentile(0.99)) + ' ms   max ' + str(round(1000 * latencies[-1], 2)) + ' ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Load test server.py')
+    parser.add_argument('--clients', type = int, default = 16)
+    parser.add_argument('--duration', type = float, default = 10)
+    parser.add_argument('--components', action = 'store_true')
+    main(parser.parse_args())
@@ -0,0 +1,61 @@
+"""
+Benchmarks spatial.SiteIndex against a brute force nearest site search. Random sites and query points are spread over
+Greater London, the grid index answers every query, and its results are checked against the brute force distances.
+
+Usage: python bench_spatial.py [--sites 1000] [--queries 5000] [--nearest 3]
+Exits with status 1 if any result differs.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import spatial
+
+#west, south, east, north of Greater London
+LONDON = (-0.51, 51.28, 0.33, 51.69)
+
+
+def random_points(rng, count: int) -> tuple[np.ndarray, np.ndarray]:
+    west, south, east, north = LONDON
+    return rng.uniform(south, north, count), rng.uniform(west, east, count)
+
+
+def main(sites: int, queries: int, nearest: int) -> int:
+    rng = np.random.default_rng(0)
+    latitudes, longitudes = random_points(rng, sites)
+    index = spatial.SiteIndex([{'SiteCode': 'S' + str(n), 'SiteName': '', 'Latitude': latitudes[n], 'Longitude': longitudes[n]} for n in range(sites)])
+    query_latitudes, query_longitudes = random_points(rng, queries)
+
+    start = time.perf_counter()
+    results = [index.nearest(query_latitudes[n], query_longitudes[n], nearest) for n in range(queries)]
+    grid_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    x, y = spatial.project(query_latitudes, query_longitudes, index.reference_latitude)
+    failures = 0
+    for n in range(queries):
+        distances = np.hypot(index.x - x[n], index.y - y[n])
+        expected = np.sort(distances)[:nearest]
+        if not np.allclose([distance for site, distance in results[n]], expected):
+            failures += 1
+    brute_time = time.perf_counter() - start
+
+    print(str(sites) + ' sites, ' + str(len(index.cells)) + ' grid cells, ' + str(queries) + ' queries for the ' + str(nearest) + ' nearest')
+    print('grid index'.ljust(14) + str(round(grid_time / queries * 1e6, 1)).rjust(8) + ' us per query')
+    print('brute force'.ljust(14) + str(round(brute_time / queries * 1e6, 1)).rjust(8) + ' us per query (including the check)')
+    print('All results match' if failures == 0 else str(failures) + ' results differ')
+    return 0 if failures == 0 else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Benchmark spatial.SiteIndex')
+    parser.add_argument('--sites', type = int, default = 1000)
+    parser.add_argument('--queries', type = int, default = 5000)
+    parser.add_argument('--nearest', type = int, default = 3)
+    args = parser.parse_args()
+    sys.exit(main(args.sites, args.queries, args.nearest))
@@ -0,0 +1,64 @@
+"""
+Guards the cold-start time of main.py. Imports main in a fresh interpreter with -X importtime, reports the slowest imports,
+and fails if reaching the main menu takes longer than the budget or loads a heavy dependency.
+
+Usage: python bench_startup.py [--budget-ms 150] [--runs 5]
+Exits with status 1 if the budget is exceeded, so it can run in CI.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+#modules that must not be imported until a submenu needs them
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'requests')
+CHECK_SCRIPT = 'import sys, main; print(",".join(sorted(set(name.split(".")[0] for name in sys.modules))))'
+
+
+def measure_import() -> tuple[float, list[tuple[float, str]], set[str]]:
+    """
+    Imports main in a new interpreter
+
+    @return: Cumulative import time of main in ms, the (cumulative ms, module) of every top-level import, and the loaded modules
+    """
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHECK_SCRIPT], cwd = PROJECT_DIR, capture_output = True, text = True, check = True)
+    imports = []
+    main_time = None
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, cumulative, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        if not name.startswith(' '):
+            imports.append((int(cumulative) / 1000, name))
+        if name == 'main':
+            main_time = int(cumulative) / 1000
+    return main_time, imports, set(result.stdout.strip().split(','))
+
+
+def main(args) -> int:
+    runs = [measure_import() for _ in range(args.runs)]
+    best_time, imports, modules = min(runs, key = lambda run: run[0])
+    print('import main: ' + str(round(best_time, 1)) + ' ms (best of ' + str(args.runs) + ', budget ' + str(args.budget_ms) + ' ms)')
+    print('slowest top-level imports:')
+    for cumulative, name in sorted(imports, reverse = True)[:5]:
+        print('    ' + name.strip().ljust(30) + str(round(cumulative, 1)).rjust(8) + ' ms')
+
+    failures = []
+    if best_time > args.budget_ms:
+        failures.append('cold start of ' + str(round(best_time, 1)) + ' ms is over the ' + str(args.budget_ms) + ' ms budget')
+    loaded = [module for module in HEAVY_MODULES if module in modules]
+    if len(loaded) > 0:
+        failures.append('heavy modules loaded before the main menu: ' + ', '.join(loaded))
+    for failure in failures:
+        print('FAIL: ' + failure)
+    return 1 if len(failures) > 0 else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Check the cold-start import time of main.py')
+    parser.add_argument('--budget-ms', type = float, default = 150)
+    parser.add_argument('--runs', type = int, default = 5)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,157 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), 'cache')
+MEMORY_CACHE_SIZE = 128
+#time to live in seconds for each class of slow-changing London Air metadata endpoint
+ENDPOINT_TTLS = {
+    '/Information/Groups': 7 * 24 * 60 * 60,
+    '/Information/MonitoringSites': 24 * 60 * 60,
+    '/Information/IndexHealthAdvice': 30 * 24 * 60 * 60,
+    '/Information/Species': 30 * 24 * 60 * 60,
+}
+#how long past its TTL a cached response may still be served while it is refreshed in the background
+STALE_WHILE_REVALIDATE = 7 * 24 * 60 * 60
+
+_memory = collections.OrderedDict()
+_lock = threading.Lock()
+_refreshing = set()
+
+
+def endpoint_ttl(endpoint: str) -> int|None:
+    """
+    Finds the time to live of an unformatted London Air API endpoint
+
+    @param endpoint: An unformatted subdomain of the London Air API, e.g. '/Information/Groups/Json'
+
+    @return: The TTL in seconds, or None if responses from the endpoint should not be cached
+    """
+
+    for prefix, ttl in ENDPOINT_TTLS.items():
+        if endpoint.startswith(prefix):
+            return ttl
+    return None
+
+
+def _cache_path(url: str) -> str:
+    return os.path.join(CACHE_DIR, hashlib.sha1(url.encode()).hexdigest() + '.json')
+
+
+def _read_entry(url: str) -> tuple[float, dict]|None:
+    """
+    Looks up a response in the in-memory LRU cache, falling back to the on-disk cache
+
+    @param url: The formatted request url the response was stored under
+
+    @return: The time the response was stored and the response, or None if it is not cached
+    """
+
+    with _lock:
+        if url in _memory:
+            _memory.move_to_end(url)
+            return _memory[url]
+    try:
+        with open(_cache_path(url)) as cache_file:
+            entry = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+    if entry.get('url') != url:
+        return None
+    _remember(url, (entry['stored_at'], entry['data']))
+    return entry['stored_at'], entry['data']
+
+
+def _remember(url: str, entry: tuple[float, dict]) -> None:
+    with _lock:
+        _memory[url] = entry
+        _memory.move_to_end(url)
+        while len(_memory) > MEMORY_CACHE_SIZE:
+            _memory.popitem(last = False)
+
+
+def _write_entry(url: str, data: dict) -> None:
+    """
+    Stores a response in both cache layers. The disk file is written atomically so readers never see half a file.
+
+    @param url: The formatted request url to store the response under
+    @param data: Parsed json response
+    """
+
+    stored_at = time.time()
+    _remember(url, (stored_at, data))
+    try:
+        os.makedirs(CACHE_DIR, exist_ok = True)
+        temp_path = _cache_path(url) + '.' + str(threading.get_ident()) + '.tmp'
+        with open(temp_path, 'w') as cache_file:
+            json.dump({'url': url, 'stored_at': stored_at, 'data': data}, cache_file)
+        os.replace(temp_path, _cache_path(url))
+    except OSError:
+        #the disk layer is best effort, the memory layer still holds the response
+        pass
+
+
+def _revalidate(url: str, fetch) -> None:
+    """
+    Refreshes a stale response in a background thread. Only one refresh per url runs at a time.
+    """
+
+    def refresh():
+        try:
+            _write_entry(url, fetch())
+        except Exception:
+            #keep serving the stale response, the next request will try again
+            pass
+        finally:
+            with _lock:
+                _refreshing.discard(url)
+
+    with _lock:
+        if url in _refreshing:
+            return
+        _refreshing.add(url)
+    threading.Thread(target = refresh, daemon = True).start()
+
+
+def get_cached(url: str, ttl: int, fetch) -> dict:
+    """
+    Returns a response from the cache if it is fresh, otherwise fetches and stores it.
+    Responses less than STALE_WHILE_REVALIDATE seconds past their TTL are returned immediately and refreshed in the background.
+
+    @param url: The formatted request url, used as the cache key
+    @param ttl: Time to live of the response in seconds
+    @param fetch: A function with no arguments that downloads the response
+
+    @return: Parsed json response
+    """
+
+    entry = _read_entry(url)
+    if entry is not None:
+        stored_at, data = entry
+        age = time.time() - stored_at
+        if age < ttl:
+            return data
+        elif age < ttl + STALE_WHILE_REVALIDATE:
+            _revalidate(url, fetch)
+            return data
+    data = fetch()
+    _write_entry(url, data)
+    return data
+
+
+def clear_cache(disk = True) -> None:
+    """
+    Empties the in-memory cache, and optionally the on-disk cache
+
+    @param disk: If True, cached responses are also deleted from CACHE_DIR
+    """
+
+    with _lock:
+        _memory.clear()
+    if disk and os.path.isdir(CACHE_DIR):
+        for filename in os.listdir(CACHE_DIR):
+            if filename.endswith('.json'):
+                os.remove(os.path.join(CACHE_DIR, filename))
@@ -0,0 +1,287 @@
+"""
+Non-interactive command line interface to the reporting, intelligence and monitoring modules, for scripted and scheduled runs.
+Every combination of the targets given is answered in one process, from one loaded dataset, and written as JSON or CSV.
+
+Usage: python main.py report --stat daily_average --stat monthly_average --station "Marylebone Road" --pollutant no --pollutant pm10
+       python main.py --format csv --output peaks.csv report --stat peak_hour_date --date 2021-03-01 --date 2021-03-02
+       python main.py report --live --stat daily_average --station Harlington
+       python main.py compare --reference "Marylebone Road" --pollutant pm10 --pollutant pm25
+       python main.py intelligence --colour red --colour cyan --upper 100 --lower 50 --components
+       python main.py monitoring dashboard --site MY1 --site KC1
+       python main.py monitoring group --group London
+       python main.py monitoring graph --site MY1 --species NO2 --start 2021-01-01 --end 2021-02-01
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import math
+import sys
+
+REPORT_STATISTICS = ('daily_average', 'daily_median', 'hourly_average', 'monthly_average', 'peak_hour_date', 'count_missing_data')
+
+
+class CLIError(Exception):
+    """
+    Raised for arguments that parse but cannot be answered, e.g. an unknown station name
+    """
+
+
+def match_names(requested: list[str]|None, available: tuple[str]) -> list[str]:
+    """
+    Matches user-typed names against the available ones, ignoring case, spaces and full stops
+
+    @param requested: Names to match, or None for all available names
+    @param available: The valid names
+
+    @return: The matching available names in the order requested
+    """
+
+    if not requested:
+        return list(available)
+    normalise = lambda name: name.lower().replace('.', '').replace(' ', '')
+    lookup = {normalise(name): name for name in available}
+    unknown = [name for name in requested if normalise(name) not in lookup]
+    if len(unknown) > 0:
+        raise CLIError('unknown name(s) ' + ', '.join(unknown) + '. Choose from ' + ', '.join(available))
+    return list(dict.fromkeys(lookup[normalise(name)] for name in requested))
+
+
+def to_json_value(value):
+    """
+    Converts NumPy scalars to Python values, and NaN to None, so results can be written as JSON
+    """
+
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def run_report(args) -> list[dict]:
+    """
+    Answers every statistic for every station and pollutant requested from the precomputed statistics cube (see cube.py),
+    or with --live from the csv data with the latest live readings appended (see dataset.py)
+
+    @return: One record per station, pollutant, statistic (and date for peak_hour_date). List results have one value per bucket.
+    """
+
+    import cube
+    import dataset
+    import reporting
+
+    stations = match_names(args.station, reporting.STATIONS)
+    pollutants = match_names(args.pollutant, reporting.POLLUTANTS)
+    statistics = args.stat or list(REPORT_STATISTICS)
+    if 'peak_hour_date' in statistics and not args.date:
+        raise CLIError('peak_hour_date needs at least one --date')
+
+    if args.live:
+        #the csv data with every reading since appended from the London Air API
+        live_dataset = dataset.load_historic(stations)
+        live_dataset.update_live([dataset.SITE_CODES[station] for station in stations])
+        view = live_dataset.reporting_view()
+        answer = lambda statistic, station, pollutant, date = None: getattr(reporting, statistic)(view, *((date,) if date else ()), station, pollutant)
+    else:
+        #the cube only needs the csv files to be read if they changed since it was saved
+        answer = cube.get_cube().answer
+    records = []
+    for station in stations:
+        for pollutant in pollutants:
+            for statistic in statistics:
+                if statistic == 'peak_hour_date':
+                    for date in args.date:
+                        try:
+                            value = answer(statistic, station, pollutant, date)
+                        except (IndexError, ValueError):
+                            raise CLIError('there is no ' + station + ' data for the date ' + date)
+                        records.append({'station': station, 'pollutant': pollutant, 'statistic': statistic, 'date': date, 'value': to_json_value(value)})
+                else:
+                    value = answer(statistic, station, pollutant)
+                    records.append({'station': station, 'pollutant': pollutant, 'statistic': statistic,
+                    'value': [to_json_value(item) for item in value] if isinstance(value, list) else to_json_value(value)})
+    return records
+
+
+def run_compare(args) -> list[dict]:
+    """
+    Compares each pollutant at a reference station against the same pollutant at the other stations
+
+    @return: One record per station and pollutant, see comparison.compare_to_reference()
+    """
+
+    import comparison
+    import reporting
+
+    reference = match_names([args.reference], reporting.STATIONS)[0]
+    stations = match_names(args.station, reporting.STATIONS)
+    pollutants = match_names(args.pollutant, reporting.POLLUTANTS)
+    data = reporting.load_data(list(dict.fromkeys([reference] + stations)))
+    records = comparison.compare_to_reference(data, reference, stations, pollutants, args.min_hours)
+    return [{key: to_json_value(value) for key, value in record.items()} for record in records]
+
+
+def run_intelligence(args) -> list[dict]:
+    """
+    Finds pixels of each requested colour in one map, and optionally their connected components
+
+    @return: One record per colour with the pixel count, and component count and sizes (largest first) if requested
+    """
+
+    import intelligence
+
+    finders = {'red': intelligence.find_red_pixels, 'cyan': intelligence.find_cyan_pixels}
+    records = []
+    for colour in dict.fromkeys(args.colour or ['red', 'cyan']):
+        gs_img = finders[colour](args.map, args.upper, args.lower)
+        record = {'colour': colour, 'map': args.map, 'upper': args.upper, 'lower': args.lower, 'pixels': int(gs_img.sum())}
+        if args.components:
+            sizes = intelligence.get_component_sizes(intelligence.detect_connected_components(gs_img))
+            record['components'] = len(sizes)
+            record['component_sizes'] = sorted(sizes, reverse = True)
+        records.append(record)
+    return records
+
+
+def run_monitoring(args) -> list[dict]:
+    """
+    Gets live dashboard values for sites, a ranked group summary, or raw readings for graphing
+
+    @return: One record per pollutant per site, per site in the group, or per reading
+    """
+
+    import monitoring
+
+    records = []
+    if args.action == 'dashboard':
+        for site_code in dict.fromkeys(code.upper() for code in args.site):
+            site_code, pollutant_codes, pollutant_names, live_pollutant_values, latest_pollutant_values, max_air_quality_index, advice, site_name, date_and_time, data = monitoring.get_dashboard_data(site_code)
+            for i in range(len(pollutant_codes)):
+                latest = latest_pollutant_values[i]
+                records.append({'site_code': site_code, 'site_name': site_name, 'bulletin_date': date_and_time, 'species_code': pollutant_codes[i],
+                'species_name': pollutant_names[i], 'live_value': live_pollutant_values[i] or None,
+                'latest_value': None if latest == 'No Data' else latest[0], 'latest_date': None if latest == 'No Data' else latest[1],
+                'air_quality_band': data['AirQualityBand'][i + 1], 'max_air_quality_index': int(max_air_quality_index)})
+    elif args.action == 'group':
+        rows, timed_out, failed = monitoring.get_group_dashboard_data(args.group, max_concurrency = args.concurrency)
+        records = [{**row, 'status': 'ok'} for row in rows]
+        records += [{'SiteCode': site_code, 'status': 'timed out'} for site_code in timed_out]
+        records += [{'SiteCode': site_code, 'status': 'failed'} for site_code in failed]
+    else:
+        for site_code in dict.fromkeys(code.upper() for code in args.site):
+            data, failed_windows = monitoring.get_stored_site_species(site_code, args.species.upper(), args.start, args.end, show_progress = False)
+            for window_start, window_end in failed_windows:
+                print('Could not fetch ' + site_code + ' ' + str(window_start) + ' to ' + str(window_end), file = sys.stderr)
+            records += [{'site_code': site_code, 'species_code': args.species.upper(), 'measurement_date': date, 'value': to_json_value(value)}
+            for date, value in zip(data['MeasurementDateGMT'], data['Value'])]
+    return records
+
+
+def write_records(records: list[dict], output_format: str, output) -> None:
+    """
+    Writes records as a JSON array, or as CSV with one row per list item (with an index column) for list values
+
+    @param records: Results to write
+    @param output_format: 'json' or 'csv'
+    @param output: A writable text file
+    """
+
+    if output_format == 'json':
+        json.dump(records, output, indent = 1)
+        output.write('\n')
+        return
+    rows = []
+    for record in records:
+        lists = {key: value for key, value in record.items() if isinstance(value, list)}
+        scalars = {key: value for key, value in record.items() if not isinstance(value, list)}
+        if len(lists) == 0:
+            rows.append(scalars)
+        else:
+            for index in range(max(len(value) for value in lists.values())):
+                rows.append({**scalars, 'index': index, **{key: value[index] if index < len(value) else None for key, value in lists.items()}})
+    fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+    writer = csv.DictWriter(output, fieldnames = fieldnames, lineterminator = '\n')
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog = 'main.py', description = 'Air Quality Analytics platform. Run without arguments for the interactive menus.')
+    parser.add_argument('--format', choices = ('json', 'csv'), default = 'json', help = 'output format (default json)')
+    parser.add_argument('--output', help = 'file to write results to (default stdout)')
+    parser.add_argument('--profile', metavar = 'PATH', help = 'record timings, HTTP and memory use and write them to PATH (.prom for Prometheus, otherwise JSON)')
+    subparsers = parser.add_subparsers(dest = 'command', required = True)
+
+    report = subparsers.add_parser('report', help = 'pollution statistics from the station csv files')
+    report.add_argument('--station', action = 'append', help = 'station name, repeatable (default all)')
+    report.add_argument('--pollutant', action = 'append', help = 'pollutant, repeatable (default all)')
+    report.add_argument('--stat', action = 'append', choices = REPORT_STATISTICS, help = 'statistic, repeatable (default all)')
+    report.add_argument('--date', action = 'append', help = 'YYYY-MM-DD date for peak_hour_date, repeatable')
+    report.add_argument('--live', action = 'store_true', help = 'append the latest readings from the London Air API to the csv data first')
+
+    compare = subparsers.add_parser('compare', help = 'correlation, ratios and differences between a reference station and the others')
+    compare.add_argument('--reference', default = 'Marylebone Road', help = 'station to compare against (default Marylebone Road)')
+    compare.add_argument('--station', action = 'append', help = 'station to compare, repeatable (default all)')
+    compare.add_argument('--pollutant', action = 'append', help = 'pollutant, repeatable (default all)')
+    compare.add_argument('--min-hours', type = int, default = 24, help = 'fewest shared hours for a comparison (default 24)')
+
+    intelligence = subparsers.add_parser('intelligence', help = 'red/cyan pixel and connected component detection on a map')
+    intelligence.add_argument('--map', default = 'map.png', help = 'map file in the data directory, or a path (default map.png)')
+    intelligence.add_argument('--colour', action = 'append', choices = ('red', 'cyan'), help = 'colour to detect, repeatable (default both)')
+    intelligence.add_argument('--upper', type = int, default = 100, choices = range(256), metavar = '0-255', help = 'upper threshold')
+    intelligence.add_argument('--lower', type = int, default = 50, choices = range(256), metavar = '0-255', help = 'lower threshold')
+    intelligence.add_argument('--components', action = 'store_true', help = 'also detect connected components')
+
+    monitoring = subparsers.add_parser('monitoring', help = 'live data from the London Air API')
+    actions = monitoring.add_subparsers(dest = 'action', required = True)
+    dashboard = actions.add_parser('dashboard', help = 'live pollutant values of sites')
+    dashboard.add_argument('--site', action = 'append', required = True, help = 'site code, repeatable')
+    group = actions.add_parser('group', help = 'air quality index of every site in a group, worst first')
+    group.add_argument('--group', default = 'London', help = 'monitoring site group name (default London)')
+    group.add_argument('--concurrency', type = int, default = 8, help = 'maximum requests in flight')
+    graph = actions.add_parser('graph', help = 'raw readings of one pollutant at sites')
+    graph.add_argument('--site', action = 'append', required = True, help = 'site code, repeatable')
+    graph.add_argument('--species', required = True, help = 'pollutant code, e.g. NO2')
+    graph.add_argument('--start', required = True, type = datetime.date.fromisoformat, help = 'YYYY-MM-DD')
+    graph.add_argument('--end', required = True, type = datetime.date.fromisoformat, help = 'YYYY-MM-DD')
+    return parser
+
+
+def main(argv: list[str]) -> int:
+    """
+    Runs one command line invocation
+
+    @param argv: Arguments after the program name
+
+    @return: Exit status, 0 on success
+    """
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    commands = {'report': run_report, 'compare': run_compare, 'intelligence': run_intelligence, 'monitoring': run_monitoring}
+    if args.profile is not None:
+        import instrumentation
+        #must happen before the command imports the instrumented modules
+        instrumentation.enable()
+    try:
+        records = commands[args.command](args)
+    except (CLIError, FileNotFoundError) as error:
+        parser.error(str(error))
+    except (ConnectionError, TimeoutError) as error:
+        print('Connection to the London Air API failed: ' + str(error), file = sys.stderr)
+        return 1
+
+    if args.output is None:
+        write_records(records, args.format, sys.stdout)
+    else:
+        with open(args.output, 'w', newline = '') as output:
+            write_records(records, args.format, output)
+    if args.profile is not None:
+        instrumentation.export(args.profile)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
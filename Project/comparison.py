@@ -0,0 +1,165 @@
+"""
+Batched comparison of monitoring station and pollutant series, e.g. roadside (Marylebone Road) against background sites
+(N. Kensington, Harlington). Every series is aligned on one hourly timestamp axis as a column of a (hours, series) matrix,
+and correlations, ratios and differences for all pairs are computed with matrix operations, so the cost grows with the
+size of the matrix products rather than with a Python loop per pair.
+"""
+
+import numpy as np
+import warnings
+
+import reporting
+
+DEFAULT_REFERENCE = 'Marylebone Road'
+MIN_PERIODS = 24
+
+
+def align_series(data: dict, stations = None, pollutants = None) -> tuple[np.ndarray, list[tuple[str, str]], np.ndarray]:
+    """
+    Aligns every station and pollutant series on a common hourly timestamp axis. Hours a station has no row for are NaN.
+
+    @param data: Raw data of each monitoring station, as from reporting.load_data()
+    @param stations: Stations to include, defaults to every station in data
+    @param pollutants: Pollutants to include, defaults to reporting.POLLUTANTS
+
+    @return: The sorted datetime64[h] timestamps, the (station, pollutant) label of each column, and the (hours, series) matrix of values
+    """
+
+    stations = list(data) if stations is None else list(stations)
+    pollutants = list(reporting.POLLUTANTS) if pollutants is None else list(pollutants)
+    station_timestamps = {station: reporting.get_timestamps(data[station]) for station in stations}
+    timestamps = np.unique(np.concatenate([station_timestamps[station] for station in stations])) if stations else np.array([], dtype = 'datetime64[h]')
+
+    labels = [(station, pollutant) for station in stations for pollutant in pollutants]
+    matrix = np.full((len(timestamps), len(labels)), np.nan)
+    for n, station in enumerate(stations):
+        rows = np.searchsorted(timestamps, station_timestamps[station])
+        columns = slice(n * len(pollutants), (n + 1) * len(pollutants))
+        matrix[rows, columns] = data[station][pollutants].to_numpy(dtype = float)
+    return timestamps, labels, matrix
+
+
+def _pairwise_sums(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sums over the hours where both series of each pair have a value, for every pair at once
+
+    @return: count[i, j], sum of i[i, j], sum of i squared[i, j], sum of i times j[i, j] and the column means used to centre the values
+    """
+
+    valid = ~np.isnan(matrix)
+    #centring on each column's mean keeps the sums of squares small, avoiding cancellation in the variances
+    with warnings.catch_warnings():
+        #all-NaN columns have no mean, they are centred on 0 and every pair with them has a count of 0
+        warnings.simplefilter('ignore', RuntimeWarning)
+        means = np.nanmean(matrix, axis = 0) if matrix.shape[0] > 0 else np.zeros(matrix.shape[1])
+    means = np.where(np.isnan(means), 0.0, means)
+    centred = np.where(valid, matrix - means, 0.0)
+    mask = valid.astype(float)
+    count = mask.T @ mask
+    sums = centred.T @ mask
+    squares = (centred * centred).T @ mask
+    products = centred.T @ centred
+    return count, sums, squares, products, means
+
+
+def correlation_matrix(matrix: np.ndarray, min_periods = MIN_PERIODS) -> np.ndarray:
+    """
+    Pearson correlation of every pair of columns over the hours both have a value, ignoring NaN
+
+    @param matrix: A (hours, series) matrix, as from align_series()
+    @param min_periods: Pairs with fewer shared hours than this are NaN
+
+    @return: A (series, series) matrix of correlations
+    """
+
+    count, sums, squares, products, means = _pairwise_sums(matrix)
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        covariance = products - sums * sums.T / count
+        variance = squares - sums * sums / count
+        correlation = covariance / np.sqrt(variance * variance.T)
+    correlation[count < max(2, min_periods)] = np.nan
+    return np.clip(correlation, -1.0, 1.0)
+
+
+def difference_statistics(matrix: np.ndarray, min_periods = MIN_PERIODS) -> dict[str, np.ndarray]:
+    """
+    Statistics of column i minus column j for every pair, over the hours both have a value
+
+    @param matrix: A (hours, series) matrix, as from align_series()
+    @param min_periods: Pairs with fewer shared hours than this are NaN
+
+    @return: (series, series) matrices 'count', 'mean_difference', 'rms_difference' and 'std_difference'
+    """
+
+    count, sums, squares, products, means = _pairwise_sums(matrix)
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        #the sums are of centred values, so the difference of the column means is added back
+        offset = means[:, None] - means[None, :]
+        centred_mean = (sums - sums.T) / count
+        centred_mean_square = (squares + squares.T - 2 * products) / count
+        mean_difference = centred_mean + offset
+        rms_difference = np.sqrt(np.maximum(centred_mean_square + 2 * offset * centred_mean + offset * offset, 0.0))
+        std_difference = np.sqrt(np.maximum(centred_mean_square - centred_mean * centred_mean, 0.0))
+    too_few = count < max(1, min_periods)
+    for statistic in (mean_difference, rms_difference, std_difference):
+        statistic[too_few] = np.nan
+    return {'count': count.astype(int), 'mean_difference': mean_difference, 'rms_difference': rms_difference, 'std_difference': std_difference}
+
+
+def ratio_series(matrix: np.ndarray, numerators: list[int], denominators: list[int]) -> np.ndarray:
+    """
+    Hourly ratios of pairs of columns, all computed in one array operation. Hours where either value is missing
+    or the denominator is not positive are NaN.
+
+    @param matrix: A (hours, series) matrix, as from align_series()
+    @param numerators: Column index of the numerator of each ratio
+    @param denominators: Column index of the denominator of each ratio, paired with numerators
+
+    @return: A (hours, ratios) matrix
+    """
+
+    numerator = matrix[:, numerators]
+    denominator = matrix[:, denominators]
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def compare_to_reference(data: dict, reference = DEFAULT_REFERENCE, stations = None, pollutants = None, min_periods = MIN_PERIODS) -> list[dict]:
+    """
+    Compares each pollutant at a reference station against the same pollutant at every other station
+
+    @param data: Raw data of each monitoring station, as from reporting.load_data()
+    @param reference: The station to compare against, e.g. a roadside site
+    @param stations: Stations to compare, defaults to every station in data
+    @param pollutants: Pollutants to compare, defaults to reporting.POLLUTANTS
+    @param min_periods: Pairs with fewer shared hours than this have NaN statistics
+
+    @return: One record per station and pollutant with the shared hours, correlation, mean and median hourly ratio of
+    reference to station, and mean, RMS and standard deviation of reference minus station
+    """
+
+    stations = list(data) if stations is None else list(stations)
+    if reference not in stations:
+        stations = [reference] + stations
+    timestamps, labels, matrix = align_series(data, stations, pollutants)
+    columns = {label: n for n, label in enumerate(labels)}
+    pairs = [(columns[(reference, pollutant)], columns[(station, pollutant)], station, pollutant)
+    for station, pollutant in labels if station != reference]
+    if len(pairs) == 0:
+        return []
+
+    references, others = [pair[0] for pair in pairs], [pair[1] for pair in pairs]
+    correlation = correlation_matrix(matrix, min_periods)[references, others]
+    differences = {name: statistic[references, others] for name, statistic in difference_statistics(matrix, min_periods).items()}
+    ratios = ratio_series(matrix, references, others)
+    ratio_counts = np.sum(~np.isnan(ratios), axis = 0)
+    enough = ratio_counts >= max(1, min_periods)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean_ratio = np.where(enough, np.nanmean(ratios, axis = 0), np.nan)
+        median_ratio = np.where(enough, np.nanmedian(ratios, axis = 0), np.nan)
+
+    return [{'reference': reference, 'station': station, 'pollutant': pollutant, 'hours': int(differences['count'][n]),
+    'correlation': float(correlation[n]), 'mean_ratio': float(mean_ratio[n]), 'median_ratio': float(median_ratio[n]),
+    'mean_difference': float(differences['mean_difference'][n]), 'rms_difference': float(differences['rms_difference'][n]),
+    'std_difference': float(differences['std_difference'][n])} for n, (_, _, station, pollutant) in enumerate(pairs)]
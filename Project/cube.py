@@ -0,0 +1,218 @@
+"""
+Precomputed reporting statistics. Every statistic the reporting menu offers is computed once for every station and
+pollutant, with one bucket index per station and frequency (see resampling.py), into a single array indexed by
+[station, pollutant, statistic, bucket]. Queries are then slices of that array. The cube is saved in the cache directory
+and rebuilt when a station's csv file changes size or modification time.
+"""
+
+import os
+
+import numpy as np
+
+import cache
+import reporting
+from instrumentation import instrument
+
+CUBE_PATH = os.path.join(cache.CACHE_DIR, 'reporting_cube.npz')
+#statistic -> (resampling frequency, resampling statistic). None buckets the whole series as one value
+STATISTICS = {
+    'daily_average': ('daily', 'mean'),
+    'daily_median': ('daily', 'median'),
+    'hourly_average': ('hour_of_day', 'mean'),
+    'monthly_average': ('monthly', 'mean'),
+    'daily_peak': ('daily', 'max'),
+    'count_missing_data': (None, 'missing'),
+}
+#bumped when the layout or the statistics change, so old cube files are rebuilt
+CUBE_VERSION = 1
+
+
+def source_signature(stations) -> np.ndarray:
+    """
+    @return: The modification time (ns) and size of each station's csv file, as an int64 array
+    """
+
+    signature = []
+    for station in stations:
+        status = os.stat(os.path.join(reporting.DATA_DIR, 'Pollution-London ' + station.replace('.', '') + '.csv'))
+        signature.append((status.st_mtime_ns, status.st_size))
+    return np.array(signature, dtype = np.int64).reshape(len(signature), 2)
+
+
+class ReportingCube:
+    """
+    Every reporting statistic for every station and pollutant, answered by slicing
+
+    @param stations: Station names, the first axis of values
+    @param pollutants: Pollutants, the second axis of values
+    @param values: Float array [station, pollutant, statistic, bucket], statistics in the order of STATISTICS
+    @param offsets: Int array [station, statistic] of the bucket each station's series starts at
+    @param lengths: Int array [station, statistic] of the number of buckets in each station's series
+    @param day_start: The date of daily bucket 0, as datetime64[D]
+    @param signature: Source file signature the cube was built from, see source_signature()
+    """
+
+    def __init__(self, stations, pollutants, values, offsets, lengths, day_start, signature):
+        self.stations = tuple(str(station) for station in stations)
+        self.pollutants = tuple(str(pollutant) for pollutant in pollutants)
+        self.values = values
+        self.offsets = offsets
+        self.lengths = lengths
+        self.day_start = np.datetime64(day_start, 'D')
+        self.signature = signature
+        self.station_index = {station: n for n, station in enumerate(self.stations)}
+        self.pollutant_index = {pollutant: n for n, pollutant in enumerate(self.pollutants)}
+        self.statistic_index = {statistic: n for n, statistic in enumerate(STATISTICS)}
+
+    def query(self, statistic: str, monitoring_station: str, pollutant: str) -> np.ndarray:
+        """
+        @param statistic: One of STATISTICS
+
+        @return: A read-only view of the statistic's buckets for the station's own date range
+        """
+
+        station = self.station_index[monitoring_station]
+        column = self.statistic_index[statistic]
+        offset = self.offsets[station, column]
+        view = self.values[station, self.pollutant_index[pollutant], column, offset:offset + self.lengths[station, column]]
+        view.flags.writeable = False
+        return view
+
+    def peak_hour_date(self, date: str, monitoring_station: str, pollutant: str) -> float:
+        """
+        @return: The highest reading at a station on a date, NaN if it has no readings
+        @raises IndexError: If the date is outside the station's data
+        """
+
+        station = self.station_index[monitoring_station]
+        column = self.statistic_index['daily_peak']
+        day = int((np.datetime64(date, 'D') - self.day_start).astype(int)) - self.offsets[station, column]
+        if not 0 <= day < self.lengths[station, column]:
+            raise IndexError('there is no data for ' + date)
+        return float(self.values[station, self.pollutant_index[pollutant], column, self.offsets[station, column] + day])
+
+    @instrument()
+    def answer(self, statistic: str, monitoring_station: str, pollutant: str, date = None):
+        """
+        Answers a reporting query with the same result as the reporting.py function of the same name
+
+        @param statistic: A reporting.py statistic function name: daily_average, daily_median, hourly_average,
+        monthly_average, peak_hour_date or count_missing_data
+        @param date: YYYY-MM-DD date, for peak_hour_date only
+        """
+
+        if statistic == 'peak_hour_date':
+            return self.peak_hour_date(date, monitoring_station, pollutant)
+        if statistic == 'count_missing_data':
+            return int(self.query(statistic, monitoring_station, pollutant)[0])
+        return self.query(statistic, monitoring_station, pollutant).tolist()
+
+
+@instrument(memory = True)
+def build_cube(data: dict, pollutants = reporting.POLLUTANTS, signature = None) -> ReportingCube:
+    """
+    Computes every statistic for every station and pollutant in data
+
+    @param data: Raw data of each monitoring station, as from reporting.load_data()
+    @param pollutants: Pollutants to include
+    @param signature: Source file signature to store with the cube, defaults to the current one
+
+    @return: The cube
+    """
+
+    import resampling
+
+    stations = list(data)
+    signature = source_signature(stations) if signature is None else signature
+    columns = {}
+    day_starts = []
+    month_starts = []
+    for station in stations:
+        timestamps = reporting.get_timestamps(data[station])
+        indexes = {frequency: resampling.bucket_index(timestamps, frequency) for frequency in ('daily', 'monthly', 'hour_of_day')}
+        indexes[None] = (np.zeros(1), np.zeros(len(timestamps), dtype = np.intp))
+        if len(timestamps) > 0:
+            day_starts.append(indexes['daily'][0][0])
+            month_starts.append(indexes['monthly'][0][0])
+        for pollutant in pollutants:
+            values = data[station][pollutant].to_numpy(dtype = float)
+            for statistic, (frequency, reduction) in STATISTICS.items():
+                starts, index = indexes[frequency]
+                columns[station, pollutant, statistic] = (starts, resampling.grouped_reduce(values, index, len(starts), reduction))
+    day_start = min(day_starts) if day_starts else np.datetime64('1970-01-01', 'D')
+    month_start = min(month_starts) if month_starts else np.datetime64('1970-01', 'M')
+
+    #each station's buckets are placed relative to the earliest station's, so one date maps to one bucket in every station
+    offsets = np.zeros((len(stations), len(STATISTICS)), dtype = np.int64)
+    lengths = np.zeros((len(stations), len(STATISTICS)), dtype = np.int64)
+    for n, station in enumerate(stations):
+        for column, (statistic, (frequency, reduction)) in enumerate(STATISTICS.items()):
+            starts, result = columns[station, pollutants[0], statistic] if pollutants else (np.zeros(0), np.zeros(0))
+            lengths[n, column] = len(result)
+            if len(starts) > 0 and frequency == 'daily':
+                offsets[n, column] = int((starts[0] - day_start).astype(int))
+            elif len(starts) > 0 and frequency == 'monthly':
+                offsets[n, column] = int((starts[0] - month_start).astype(int))
+    values = np.full((len(stations), len(pollutants), len(STATISTICS), int((offsets + lengths).max(initial = 0))), np.nan)
+    for n, station in enumerate(stations):
+        for p, pollutant in enumerate(pollutants):
+            for column, statistic in enumerate(STATISTICS):
+                values[n, p, column, offsets[n, column]:offsets[n, column] + lengths[n, column]] = columns[station, pollutant, statistic][1]
+    return ReportingCube(stations, pollutants, values, offsets, lengths, day_start, signature)
+
+
+def save_cube(cube: ReportingCube, path = CUBE_PATH) -> None:
+    """
+    Saves a cube as a .npz file, written atomically. Saving is best effort, failures are ignored.
+    """
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        temp_path = path + '.' + str(os.getpid()) + '.tmp.npz'
+        np.savez(temp_path, version = CUBE_VERSION, stations = np.array(cube.stations), pollutants = np.array(cube.pollutants), values = cube.values,
+        offsets = cube.offsets, lengths = cube.lengths, day_start = cube.day_start, signature = cube.signature)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+@instrument()
+def load_cube(stations = reporting.STATIONS, pollutants = reporting.POLLUTANTS, path = CUBE_PATH) -> ReportingCube|None:
+    """
+    Loads a saved cube if it was built from the current csv files of exactly these stations and pollutants
+
+    @return: The cube, or None if there is no saved cube or it is out of date
+    """
+
+    try:
+        with np.load(path, allow_pickle = False) as saved:
+            if int(saved['version']) != CUBE_VERSION or tuple(saved['stations']) != tuple(stations) or tuple(saved['pollutants']) != tuple(pollutants):
+                return None
+            if not np.array_equal(saved['signature'], source_signature(stations)):
+                return None
+            return ReportingCube(saved['stations'], saved['pollutants'], saved['values'], saved['offsets'], saved['lengths'], saved['day_start'], saved['signature'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+@instrument()
+def get_cube(stations = reporting.STATIONS, data = None, path = CUBE_PATH) -> ReportingCube:
+    """
+    Loads the saved cube, or builds and saves it if it is missing or out of date
+
+    @param stations: Stations the cube must cover
+    @param data: Already loaded data of those stations, used if the cube has to be built. Loaded from the csv files if None.
+
+    @return: The cube
+    """
+
+    stations = tuple(stations)
+    cube = load_cube(stations, path = path)
+    if cube is None:
+        #the signature is taken before reading, so a file changed during the build makes the next load rebuild
+        signature = source_signature(stations)
+        if data is None or tuple(data) != stations:
+            data = reporting.load_data(stations)
+        cube = build_cube(data, signature = signature)
+        save_cube(cube, path)
+    return cube
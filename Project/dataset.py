@@ -0,0 +1,300 @@
+"""
+One time series dataset for the historic station csv files and the live London Air feed. Series are keyed by site code
+and species code (e.g. ('MY1', 'NO')) and hold typed columns: hour-ending datetime64[h] timestamps and float values,
+with missing readings as NaN whichever source they came from ('No data' in the csv files, '' or negative values live).
+
+Each series is append-only and stored in chunks. The historic csv column is the first chunk and is never copied. Live
+readings are written into preallocated chunks after it, so an append costs time proportional to the new readings only.
+reporting_view() presents the dataset in the shape reporting.py expects, so every reporting function runs on
+up-to-the-hour data without reloading the csv files.
+
+Timestamps follow the csv convention: a reading is stamped with the end of its hour (01:00:00 to 24:00:00). The API's
+MeasurementDateGMT is the start of the hour, so live readings are moved on by one hour when they are appended.
+"""
+
+import collections.abc
+
+import numpy as np
+
+import reporting
+
+#site codes of the stations in the csv files, and species codes of their pollutant columns
+SITE_CODES = {'Marylebone Road': 'MY1', 'N. Kensington': 'KC1', 'Harlington': 'LH2'}
+SPECIES_CODES = {'no': 'NO', 'pm10': 'PM10', 'pm25': 'PM25'}
+CHUNK_SIZE = 4096
+
+
+class Series:
+    """
+    Append-only hourly series of one species at one site, stored as a list of chunks. Each chunk is a pair of timestamp
+    and value arrays and the number of their rows in use. Only the last chunk has unused rows.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.length = 0
+        self._arrays = None
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def last_timestamp(self):
+        """
+        @return: The latest timestamp as datetime64[h], or None if the series is empty
+        """
+
+        if self.length == 0:
+            return None
+        timestamps, values, used = self.chunks[-1]
+        return timestamps[used - 1]
+
+    def append(self, timestamps: np.ndarray, values: np.ndarray, copy = True) -> int:
+        """
+        Appends readings later than the last one in the series. Earlier and repeated hours are ignored, as the series
+        is append-only.
+
+        @param timestamps: Hour-ending timestamps of the readings, in any order
+        @param values: Float readings, NaN if missing
+        @param copy: If False, the series is empty and the readings are already in order with one per hour, the arrays
+        are kept as the first chunk without copying them. They must then not be modified by the caller.
+
+        @return: The number of readings appended
+        """
+
+        timestamps = np.asarray(timestamps, dtype = 'datetime64[h]')
+        values = np.asarray(values, dtype = float)
+        if len(timestamps) == 0:
+            return 0
+        if not np.all(timestamps[1:] > timestamps[:-1]):
+            #sorted with one reading per hour, the last one received wins
+            timestamps, first = np.unique(timestamps[::-1], return_index = True)
+            values = values[::-1][first]
+        if self.length > 0:
+            keep = timestamps > self.last_timestamp
+            timestamps, values = timestamps[keep], values[keep]
+        if len(timestamps) == 0:
+            return 0
+
+        if self.length == 0 and not copy:
+            self.chunks.append([timestamps, values, len(timestamps)])
+        else:
+            written = 0
+            while written < len(timestamps):
+                if len(self.chunks) == 0 or self.chunks[-1][2] == len(self.chunks[-1][0]):
+                    size = max(CHUNK_SIZE, len(timestamps) - written)
+                    self.chunks.append([np.empty(size, dtype = 'datetime64[h]'), np.empty(size), 0])
+                chunk = self.chunks[-1]
+                count = min(len(chunk[0]) - chunk[2], len(timestamps) - written)
+                chunk[0][chunk[2]:chunk[2] + count] = timestamps[written:written + count]
+                chunk[1][chunk[2]:chunk[2] + count] = values[written:written + count]
+                chunk[2] += count
+                written += count
+        self.length += len(timestamps)
+        self._arrays = None
+        return len(timestamps)
+
+    def arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        @return: Read-only timestamp and value arrays of the whole series. A series of one full chunk is returned without
+        copying, otherwise the chunks are joined once and reused until the next append.
+        """
+
+        if self._arrays is None:
+            if len(self.chunks) == 1:
+                timestamps, values, used = self.chunks[0]
+                timestamps, values = timestamps[:used], values[:used]
+            elif len(self.chunks) == 0:
+                timestamps, values = np.array([], dtype = 'datetime64[h]'), np.array([], dtype = float)
+            else:
+                timestamps = np.concatenate([chunk[0][:chunk[2]] for chunk in self.chunks])
+                values = np.concatenate([chunk[1][:chunk[2]] for chunk in self.chunks])
+            timestamps, values = timestamps.view(), values.view()
+            timestamps.flags.writeable = False
+            values.flags.writeable = False
+            self._arrays = (timestamps, values)
+        return self._arrays
+
+
+class Dataset:
+    """
+    Series of every site and species, from historic and live sources
+    """
+
+    def __init__(self):
+        self.series = {}
+        self.version = 0
+
+    def get(self, site_code: str, species_code: str) -> Series:
+        """
+        @return: The series of a site and species, created empty if there is none
+        """
+
+        key = (site_code.upper(), species_code.upper())
+        if key not in self.series:
+            self.series[key] = Series()
+        return self.series[key]
+
+    def keys(self) -> list[tuple[str, str]]:
+        return sorted(self.series)
+
+    def append(self, site_code: str, species_code: str, timestamps: np.ndarray, values: np.ndarray, copy = True) -> int:
+        """
+        Appends readings to a series, see Series.append()
+
+        @return: The number of readings appended
+        """
+
+        appended = self.get(site_code, species_code).append(timestamps, values, copy)
+        self.version += appended > 0
+        return appended
+
+    def append_live(self, site_code: str, frame, species_code = None) -> int:
+        """
+        Appends live readings, as a DataFrame from monitoring.unpack_json() of a /Data/SiteSpecies/ or /Data/Site/ payload
+
+        @param site_code: Code of the site the readings are from
+        @param frame: DataFrame with MeasurementDateGMT and Value columns, and a SpeciesCode column unless species_code is given
+        @param species_code: Species of every reading, for /Data/SiteSpecies/ payloads
+
+        @return: The number of readings appended. Hours after the last one with a value are left to a later append.
+        """
+
+        import monitoring
+
+        if frame is None or len(frame) == 0:
+            return 0
+        timestamps, values = monitoring.decode_readings(frame['MeasurementDateGMT'], frame['Value'])
+        #MeasurementDateGMT is the start of the hour, the dataset stamps readings with its end
+        timestamps = timestamps.astype('datetime64[h]') + np.timedelta64(1, 'h')
+        if species_code is not None:
+            return self._append_measured(site_code, species_code, timestamps, values)
+        species = frame['SpeciesCode'].to_numpy(dtype = str)
+        return sum(self._append_measured(site_code, code, timestamps[species == code], values[species == code]) for code in np.unique(species))
+
+    def _append_measured(self, site_code: str, species_code: str, timestamps: np.ndarray, values: np.ndarray) -> int:
+        """
+        Appends live readings up to the last hour with a value. The API lists hours not yet measured with no value, and
+        appending them would move the series past readings still to come.
+        """
+
+        if len(timestamps) > 0 and not np.all(timestamps[1:] > timestamps[:-1]):
+            order = np.argsort(timestamps, kind = 'stable')
+            timestamps, values = timestamps[order], values[order]
+        measured = np.flatnonzero(~np.isnan(values))
+        end = measured[-1] + 1 if len(measured) > 0 else 0
+        return self.append(site_code, species_code, timestamps[:end], values[:end])
+
+    def update_live(self, site_codes = None, max_concurrency = 8) -> dict[str, int]:
+        """
+        Brings each site's series up to date from the London Air API and appends the new readings. Readings go through the
+        local time-series store (see monitoring.get_stored_site_species()), so only days not yet stored are downloaded,
+        in parallel monthly windows, and later runs only fetch today.
+
+        @param site_codes: Sites to update, defaults to every site in the dataset. Each is updated for the species it has.
+        @param max_concurrency: The maximum number of series fetched at once
+
+        @return: The number of readings appended per site. Series that could not be fetched are left out.
+        """
+
+        import concurrent.futures
+        import datetime
+        import monitoring
+
+        site_codes = {site for site, species in self.series} if site_codes is None else {code.upper() for code in site_codes}
+        today = datetime.date.today()
+
+        def fetch(site_code: str, species_code: str):
+            latest = self.series[site_code, species_code].last_timestamp
+            #from the day of the series' latest reading, but at most a year ago
+            start = today if latest is None else max((latest - np.timedelta64(1, 'h')).astype('datetime64[D]').astype(datetime.date), today - datetime.timedelta(days = 365))
+            return monitoring.get_stored_site_species(site_code, species_code, start, today + datetime.timedelta(days = 1), show_progress = False)[0]
+
+        appended = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers = max(1, max_concurrency)) as executor:
+            futures = {executor.submit(fetch, site, species): (site, species) for site, species in self.keys() if site in site_codes}
+            #appends happen on this thread only
+            for future in concurrent.futures.as_completed(futures):
+                site_code, species_code = futures[future]
+                try:
+                    frame = future.result()
+                except (ConnectionError, TimeoutError, ValueError):
+                    continue
+                appended[site_code] = appended.get(site_code, 0) + self.append_live(site_code, frame, species_code)
+        return appended
+
+    def reporting_view(self, pollutants = reporting.POLLUTANTS) -> 'ReportingView':
+        """
+        @return: A view of the dataset that the reporting.py functions accept in place of reporting.load_data()
+        """
+
+        return ReportingView(self, pollutants)
+
+
+class ReportingView(collections.abc.Mapping):
+    """
+    Presents a dataset as reporting.load_data() does: a DataFrame per station with date, time and pollutant columns, plus a
+    typed timestamp column. Stations in the csv files are keyed by name, other sites by site code. Frames are built when
+    first used and rebuilt after the dataset is appended to, so while an append costs time proportional to the new readings,
+    the next read of a station costs time proportional to all of its readings.
+    """
+
+    def __init__(self, dataset: Dataset, pollutants = reporting.POLLUTANTS):
+        self.dataset = dataset
+        self.pollutants = tuple(pollutants)
+        self.frames = {}
+
+    def _site_code(self, station: str) -> str:
+        return SITE_CODES.get(station, station)
+
+    def __iter__(self):
+        names = {code: name for name, code in SITE_CODES.items()}
+        return iter(dict.fromkeys(names.get(site, site) for site, species in self.dataset.keys()))
+
+    def __len__(self) -> int:
+        return len(list(iter(self)))
+
+    def __getitem__(self, station: str):
+        import pandas as pd
+
+        site_code = self._site_code(station)
+        if not any(site == site_code for site, species in self.dataset.series):
+            raise KeyError(station)
+        cached = self.frames.get(station)
+        if cached is not None and cached[0] == self.dataset.version:
+            return cached[1]
+
+        columns = {pollutant: self.dataset.series.get((site_code, SPECIES_CODES.get(pollutant, pollutant.upper()))) for pollutant in self.pollutants}
+        arrays = {pollutant: series.arrays() for pollutant, series in columns.items() if series is not None}
+        timestamps = np.unique(np.concatenate([array[0] for array in arrays.values()])) if arrays else np.array([], dtype = 'datetime64[h]')
+        frame = {}
+        hour_starts = timestamps - np.timedelta64(1, 'h')
+        frame['date'] = hour_starts.astype('datetime64[D]').astype(str)
+        frame['time'] = np.char.add(np.char.zfill((hour_starts.astype(np.int64) % 24 + 1).astype(str), 2), ':00:00')
+        for pollutant in self.pollutants:
+            column = np.full(len(timestamps), np.nan)
+            if pollutant in arrays:
+                column[np.searchsorted(timestamps, arrays[pollutant][0])] = arrays[pollutant][1]
+            frame[pollutant] = column
+        frame['timestamp'] = timestamps
+        frame = pd.DataFrame(frame)
+        self.frames[station] = (self.dataset.version, frame)
+        return frame
+
+
+def load_historic(stations = reporting.STATIONS) -> Dataset:
+    """
+    Builds a dataset from the station csv files. Each pollutant column becomes the first chunk of its series without being copied.
+
+    @param stations: Names of the monitoring stations to load
+
+    @return: The dataset
+    """
+
+    dataset = Dataset()
+    data = reporting.load_data(stations)
+    for station in stations:
+        timestamps = reporting.get_timestamps(data[station])
+        for pollutant in reporting.POLLUTANTS:
+            dataset.append(SITE_CODES.get(station, station), SPECIES_CODES[pollutant], timestamps, data[station][pollutant].to_numpy(dtype = float), copy = False)
+    return dataset
@@ -0,0 +1,135 @@
+"""
+Headless bulk export of monitoring graphs, for generating reports for many sites without a display.
+
+Usage: python graph_export.py MY1 KC1 ... --species NO2 --start 2021-01-01 --end 2022-01-01 [--output graphs] [--format png]
+       python graph_export.py --group London --species NO2 --start 2021-01-01 --end 2022-01-01
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import os
+import time
+
+EXPORT_DIR = os.path.join(os.path.dirname(__file__), 'graphs')
+FETCH_WORKERS = 8
+IMAGE_WIDTH = 12
+IMAGE_HEIGHT = 6
+IMAGE_DPI = 100
+
+
+def render_graph_file(site_code: str, species_code: str, x_values, y_values, path: str) -> str:
+    """
+    Draws one site's series with the non-interactive Agg backend and saves it. Runs in a worker process.
+
+    @param site_code: Code of the monitoring site, used in the title
+    @param species_code: Code of the pollutant, used in the labels
+    @param x_values: datetime64 timestamps
+    @param y_values: Float values, NaN where missing
+    @param path: File to save to. The format is taken from its extension.
+
+    @return: path
+    """
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import monitoring
+
+    figure, axes = plt.subplots(figsize = (IMAGE_WIDTH, IMAGE_HEIGHT), dpi = IMAGE_DPI)
+    if len(x_values) > 0:
+        x_values, y_values = monitoring.decimate_minmax(x_values, y_values, x_values[0], x_values[-1], axes.bbox.width)
+    axes.plot(x_values, y_values, marker = 'o', markersize = 2, linestyle = '', label = site_code)
+    axes.set_xlabel('Time')
+    axes.set_ylabel(species_code + ' Level')
+    axes.set_title(site_code + ' ' + species_code + ' Levels Over Time')
+    axes.legend()
+    figure.savefig(path)
+    plt.close(figure)
+    return path
+
+
+def export_graphs(site_codes: list[str], species_code: str, start_date: datetime.date, end_date: datetime.date, output_dir = EXPORT_DIR,
+file_format = 'png', fetch_workers = FETCH_WORKERS, render_workers = None) -> dict:
+    """
+    Fetches the series of one pollutant for many sites concurrently, then renders a graph file for each in a process pool.
+    Series are read through the local time-series store, so only data missing from it is downloaded.
+
+    @param site_codes: Codes of the monitoring sites to export
+    @param species_code: Code of the pollutant to plot
+    @param start_date: Start of the plotted period
+    @param end_date: End of the plotted period
+    @param output_dir: Directory the graphs are written to, created if needed
+    @param file_format: 'png' or 'svg'
+    @param fetch_workers: The maximum number of sites downloaded at once
+    @param render_workers: Number of rendering processes, defaults to the number of CPUs
+
+    @return: Paths written, sites that failed with their errors, fetch and render times, and images per second
+    """
+
+    import monitoring
+
+    os.makedirs(output_dir, exist_ok = True)
+    export_start = time.perf_counter()
+    series = {}
+    failed = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers = max(1, fetch_workers)) as executor:
+        futures = {executor.submit(monitoring.get_stored_site_species, site_code, species_code, start_date, end_date, show_progress = False): site_code
+        for site_code in dict.fromkeys(site_codes)}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                data, failed_windows = future.result()
+                series[futures[future]] = monitoring.decode_readings(data['MeasurementDateGMT'], data['Value'])
+            except Exception as error:
+                failed[futures[future]] = str(error)
+    fetch_time = time.perf_counter() - export_start
+
+    render_start = time.perf_counter()
+    paths = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers = render_workers) as executor:
+        futures = {executor.submit(render_graph_file, site_code, species_code, x_values, y_values,
+        os.path.join(output_dir, site_code + '_' + species_code + '_' + str(start_date) + '_' + str(end_date) + '.' + file_format)): site_code
+        for site_code, (x_values, y_values) in series.items()}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                paths.append(future.result())
+            except Exception as error:
+                failed[futures[future]] = str(error)
+    render_time = time.perf_counter() - render_start
+    total_time = time.perf_counter() - export_start
+
+    return {
+        'paths': sorted(paths),
+        'failed': failed,
+        'fetch_time': fetch_time,
+        'render_time': render_time,
+        'total_time': total_time,
+        'images_per_second': len(paths) / total_time if total_time > 0 else 0.0,
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Export monitoring graphs for many sites without a display')
+    parser.add_argument('site_codes', nargs = '*', help = 'monitoring site codes to export')
+    parser.add_argument('--group', help = 'export every operating site in this monitoring site group instead')
+    parser.add_argument('--species', required = True, help = 'pollutant code, e.g. NO2')
+    parser.add_argument('--start', required = True, type = datetime.date.fromisoformat, help = 'start date in the YYYY-MM-DD format')
+    parser.add_argument('--end', required = True, type = datetime.date.fromisoformat, help = 'end date in the YYYY-MM-DD format')
+    parser.add_argument('--output', default = EXPORT_DIR)
+    parser.add_argument('--format', default = 'png', choices = ('png', 'svg'))
+    parser.add_argument('--workers', type = int, default = None, help = 'number of rendering processes')
+    args = parser.parse_args()
+
+    site_codes = args.site_codes
+    if args.group is not None:
+        import monitoring
+        sites = monitoring.unpack_json(monitoring.get_live_data_from_api('/Information/MonitoringSites/GroupName={group_name}/Json', group_name = args.group), ['Sites', 'Site'])
+        site_codes = site_codes + ([] if sites is None else list(sites.loc[sites['DateClosed'] == '']['SiteCode']))
+    if len(site_codes) == 0:
+        parser.error('no monitoring sites to export')
+
+    result = export_graphs(site_codes, args.species, args.start, args.end, args.output, args.format, render_workers = args.workers)
+    for site_code, error in sorted(result['failed'].items()):
+        print('Failed ' + site_code + ': ' + error)
+    print('Exported ' + str(len(result['paths'])) + ' graphs to ' + args.output + ' in ' + str(round(result['total_time'], 2)) + ' s (fetch ' +
+    str(round(result['fetch_time'], 2)) + ' s, render ' + str(round(result['render_time'], 2)) + ' s, ' + str(round(result['images_per_second'], 2)) + ' images/s)')
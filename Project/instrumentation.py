@@ -0,0 +1,199 @@
+"""
+Opt-in profiling of the platform's hot paths: call counts and latency histograms per function, HTTP request counts,
+bytes and latency per London Air endpoint, and peak memory per operation.
+
+Profiling is enabled by setting the AQ_PROFILE environment variable (or calling enable() before the instrumented modules
+are imported, as the --profile option of cli.py does). When it is disabled, @instrument returns functions unchanged and
+record_http() is skipped by callers, so there is no overhead. If AQ_PROFILE_OUTPUT is set, results are written there on
+exit, in the Prometheus text format if the name ends in .prom and as JSON otherwise.
+"""
+
+import atexit
+import bisect
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+ENABLED = os.environ.get('AQ_PROFILE', '') not in ('', '0')
+#upper bounds in seconds of the latency histogram buckets, the last bucket is unbounded
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_functions = {}
+_http = {}
+_memory = {}
+_memory_stack = []
+
+
+def enable() -> None:
+    """
+    Turns profiling on. Only functions decorated after this call are instrumented.
+    """
+
+    global ENABLED
+    ENABLED = True
+
+
+def _new_histogram() -> dict:
+    return {'count': 0, 'total': 0.0, 'max': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS) + 1)}
+
+
+def _observe(histogram: dict, seconds: float) -> None:
+    histogram['count'] += 1
+    histogram['total'] += seconds
+    histogram['max'] = max(histogram['max'], seconds)
+    histogram['buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+
+def instrument(name = None, memory = False):
+    """
+    Decorator recording the call count and latency of a function, and optionally its peak memory use
+
+    @param name: Name to record the function under, defaults to module.function
+    @param memory: If True, peak memory allocated during each call is recorded with tracemalloc
+
+    @return: The decorator. It returns the function unchanged if profiling is disabled.
+    """
+
+    def decorator(function):
+        if not ENABLED:
+            return function
+        label = name or function.__module__ + '.' + function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                if memory:
+                    with measure_memory(label):
+                        return function(*args, **kwargs)
+                return function(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                with _lock:
+                    _observe(_functions.setdefault(label, _new_histogram()), seconds)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def measure_memory(name: str):
+    """
+    Context manager recording the peak memory allocated while it is open, using tracemalloc.
+    Operations can be nested: an outer operation's peak includes its inner operations.
+
+    @param name: Name to record the operation under
+    """
+
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        current, peak = tracemalloc.get_traced_memory()
+        if len(_memory_stack) > 0:
+            _memory_stack[-1][1] = max(_memory_stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        _memory_stack.append([current, 0])
+    try:
+        yield
+    finally:
+        with _lock:
+            current, peak = tracemalloc.get_traced_memory()
+            start, inner_peak = _memory_stack.pop()
+            peak = max(peak, inner_peak)
+            _memory[name] = max(_memory.get(name, 0), peak - start)
+            if len(_memory_stack) > 0:
+                _memory_stack[-1][1] = max(_memory_stack[-1][1], peak)
+            else:
+                tracemalloc.stop()
+
+
+def endpoint_class(endpoint: str) -> str:
+    """
+    Groups an unformatted London Air endpoint by removing its parameters, e.g. '/Hourly/MonitoringIndex/SiteCode={site_code}/Json' -> '/Hourly/MonitoringIndex'
+    """
+
+    return '/' + '/'.join([part for part in endpoint.strip('/').split('/') if '=' not in part and part.lower() != 'json'])
+
+
+def record_http(endpoint: str, status: int|None, size: int, seconds: float) -> None:
+    """
+    Records one HTTP request. Callers should check ENABLED first.
+
+    @param endpoint: Unformatted endpoint the request was made to
+    @param status: HTTP status code, or None if no response was received
+    @param size: Bytes received
+    @param seconds: Time taken by the request
+    """
+
+    with _lock:
+        stats = _http.setdefault(endpoint_class(endpoint), {'requests': 0, 'errors': 0, 'bytes': 0, 'latency': _new_histogram()})
+        stats['requests'] += 1
+        stats['errors'] += status is None or status >= 400
+        stats['bytes'] += size
+        _observe(stats['latency'], seconds)
+
+
+def get_results() -> dict:
+    """
+    @return: A copy of everything recorded, as {'functions': {...}, 'http': {...}, 'peak_memory_bytes': {...}}
+    """
+
+    with _lock:
+        return json.loads(json.dumps({'functions': _functions, 'http': _http, 'peak_memory_bytes': _memory}))
+
+
+def reset() -> None:
+    with _lock:
+        _functions.clear()
+        _http.clear()
+        _memory.clear()
+
+
+def _prometheus_histogram(lines: list[str], metric: str, labels: str, histogram: dict) -> None:
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), histogram['buckets']):
+        cumulative += count
+        lines.append(metric + '_bucket{' + labels + ',le="' + str(bound) + '"} ' + str(cumulative))
+    lines.append(metric + '_sum{' + labels + '} ' + repr(histogram['total']))
+    lines.append(metric + '_count{' + labels + '} ' + str(histogram['count']))
+
+
+def to_prometheus() -> str:
+    """
+    @return: Everything recorded in the Prometheus text exposition format
+    """
+
+    results = get_results()
+    lines = ['# HELP aq_function_seconds Latency of instrumented functions', '# TYPE aq_function_seconds histogram']
+    for name, histogram in sorted(results['functions'].items()):
+        _prometheus_histogram(lines, 'aq_function_seconds', 'function="' + name + '"', histogram)
+    lines += ['# HELP aq_http_request_seconds Latency of London Air API requests', '# TYPE aq_http_request_seconds histogram']
+    for endpoint, stats in sorted(results['http'].items()):
+        _prometheus_histogram(lines, 'aq_http_request_seconds', 'endpoint="' + endpoint + '"', stats['latency'])
+    for metric, key, help_text in (('aq_http_requests_total', 'requests', 'London Air API requests'), ('aq_http_errors_total', 'errors', 'Failed London Air API requests'),
+    ('aq_http_received_bytes_total', 'bytes', 'Bytes received from the London Air API')):
+        lines += ['# HELP ' + metric + ' ' + help_text, '# TYPE ' + metric + ' counter']
+        lines += [metric + '{endpoint="' + endpoint + '"} ' + str(stats[key]) for endpoint, stats in sorted(results['http'].items())]
+    lines += ['# HELP aq_peak_memory_bytes Peak memory allocated during an operation', '# TYPE aq_peak_memory_bytes gauge']
+    lines += ['aq_peak_memory_bytes{operation="' + name + '"} ' + str(peak) for name, peak in sorted(results['peak_memory_bytes'].items())]
+    return '\n'.join(lines) + '\n'
+
+
+def export(path: str) -> None:
+    """
+    Writes everything recorded to a file, in the Prometheus text format if path ends in .prom and as JSON otherwise
+    """
+
+    with open(path, 'w') as output:
+        if path.endswith('.prom'):
+            output.write(to_prometheus())
+        else:
+            json.dump(get_results(), output, indent = 1)
+
+
+if ENABLED and os.environ.get('AQ_PROFILE_OUTPUT'):
+    atexit.register(export, os.environ['AQ_PROFILE_OUTPUT'])
@@ -1,8 +1,10 @@
 import numpy as np
 import os
-from matplotlib import pyplot as mat_plot
 
-def find_red_pixels(map_filename: str, upper_threshold = 100, lower_threshold = 50) -> np.ndarray:
+from instrumentation import instrument
+
+@instrument(memory = True)
+def find_red_pixels(map_filename: str, upper_threshold = 100, lower_threshold = 50, output = True) -> np.ndarray:
     """
     Finds all red pixels in an rgb image, and outputs a greyscale jpg image (map_red_pixels.jpg)
     where only red pixels are white to CWD
@@ -10,10 +12,13 @@ def find_red_pixels(map_filename: str, upper_threshold = 100, lower_threshold =
     @param map_file: Name of rgb image file in data directory of CWD
     @param upper_threshold: Upper rgb threshold (0-255) for evaluating if a pixel is red
     @param lower_threshold: Lower rgb threshold (0-255) for evaluating if a pixel is red
+    @param output: If False, the greyscale jpg image is not written
 
     @returns: A binary array representation of the greyscale image outputed. White pixels are 1 and black pixels are 0.
     """
 
+    from matplotlib import pyplot as mat_plot
+
     rgb_img = mat_plot.imread(os.path.join(os.path.dirname(__file__), 'data', map_filename))
     rgb_img = rgb_img * 255
     gs_img = []
@@ -27,11 +32,13 @@ def find_red_pixels(map_filename: str, upper_threshold = 100, lower_threshold =
                 gs_img.append(False)
     
     gs_img = np.reshape(gs_img, rgb_img.shape[0:2])
-    mat_plot.imsave(os.path.join(os.path.dirname(__file__), 'map_red_pixels.jpg'), gs_img, cmap = mat_plot.cm.gray)
+    if output:
+        mat_plot.imsave(os.path.join(os.path.dirname(__file__), 'map_red_pixels.jpg'), gs_img, cmap = mat_plot.cm.gray)
     return(gs_img)
 
 
-def find_cyan_pixels(map_filename: str, upper_threshold = 100, lower_threshold = 50) -> np.ndarray:
+@instrument(memory = True)
+def find_cyan_pixels(map_filename: str, upper_threshold = 100, lower_threshold = 50, output = True) -> np.ndarray:
     """
     Finds all cyan pixels in an rgb image, and outputs a greyscale jpg image (map_cyan_pixels.jpg) 
     where only cyan pixels are white to CWD
@@ -39,10 +46,13 @@ def find_cyan_pixels(map_filename: str, upper_threshold = 100, lower_threshold =
     @param map_file: Name of rgb image file in data directory of CWD
     @param upper_threshold: Upper rgb threshold (0-255) for evaluating if a pixel is cyan
     @param lower_threshold: Lower rgb threshold (0-255) for evaluating if a pixel is cyan
+    @param output: If False, the greyscale jpg image is not written
 
     @returns: A binary array representation of the greyscale image outputed. White pixels are 1 and black pixels are 0.
     """
     
+    from matplotlib import pyplot as mat_plot
+
     rgb_img = mat_plot.imread(os.path.join(os.path.dirname(__file__), 'data', map_filename))
     rgb_img = rgb_img * 255
     gs_img = []
@@ -56,16 +66,19 @@ def find_cyan_pixels(map_filename: str, upper_threshold = 100, lower_threshold =
                 gs_img.append(False)
     
     gs_img = np.reshape(gs_img, rgb_img.shape[0:2])
-    mat_plot.imsave(os.path.join(os.path.dirname(__file__), 'map_cyan_pixels.jpg'), gs_img, cmap = mat_plot.cm.gray)
+    if output:
+        mat_plot.imsave(os.path.join(os.path.dirname(__file__), 'map_cyan_pixels.jpg'), gs_img, cmap = mat_plot.cm.gray)
     return(gs_img)
 
 
-def detect_connected_components(gs_img: np.ndarray) -> np.ndarray:
+@instrument(memory = True)
+def detect_connected_components(gs_img: np.ndarray, output = True) -> np.ndarray:
     """
     Detects connected components in binary array representation of a greyscale image (continuous areas of white)
     Records size and number of connected components in text file (cc-output-2a.txt) outputted to CWD
 
     @param gs_img: A binary array representation of the greyscale image. White pixels are 1 and black pixels are 0.
+    @param output: If False, the text file is not written
 
     @return mark: An array representation of connected component locations in greyscale image
 
@@ -117,12 +130,30 @@ def detect_connected_components(gs_img: np.ndarray) -> np.ndarray:
                 mark.flat[segment_no - 1] = current_head - initial_head - 1
                 segment_no = segment_no + 1
     
-    output = open(os.path.join(os.path.dirname(__file__), 'cc-output-2a.txt'), 'w+')
-    output.writelines(['Connected Component ' + str(key) + ', number of pixels = ' + str(value) +'\n' for key, value in segment_lengths.items()])
-    output.write('Total number of connected components = ' + str(segment_no - 1))
-    output.close()    
+    if output:
+        output_file = open(os.path.join(os.path.dirname(__file__), 'cc-output-2a.txt'), 'w+')
+        output_file.writelines(['Connected Component ' + str(key) + ', number of pixels = ' + str(value) +'\n' for key, value in segment_lengths.items()])
+        output_file.write('Total number of connected components = ' + str(segment_no - 1))
+        output_file.close()
     return mark
 
+def get_component_sizes(mark: np.ndarray) -> list[int]:
+    """
+    Gets the size of every connected component from MARK, in segment number order
+
+    @param mark: An array representation of connected component locations and sizes, from detect_connected_components()
+
+    @return: The number of pixels in each connected component
+    """
+
+    sizes = []
+    for n in range(mark.size):
+        if mark.flat[n] == 0:
+            break
+        sizes.append(int(mark.flat[n]))
+    return sizes
+
+@instrument(memory = True)
 def detect_connected_components_sorted(mark: np.ndarray) -> None:
     """
     Gets segments numbers and sizes from MARK. Sorts segments numbers by size. Outputs ordered text file (cc_top_2.jpg) to CWD.
@@ -130,6 +161,8 @@ def detect_connected_components_sorted(mark: np.ndarray) -> None:
     @param mark: An array representation of connected component locations and sizes in greyscale image
     """
     
+    from matplotlib import pyplot as mat_plot
+
     segment_lengths = []
 
     #iterate through all segment sizes
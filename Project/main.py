@@ -1,9 +1,6 @@
 import os
 
-from intelligence import *
-from monitoring import *
-from utils import *
-from reporting import *
+#submodules are imported inside their menus, so pandas, NumPy and matplotlib are only loaded when a menu needs them
 
 
 def main_menu() -> None:
@@ -31,7 +28,8 @@ def reporting_menu() -> None:
     Prints the reporting sub-menu interface and allows the user to access functions in reporting.py
     """
     
-    import pandas as pd
+    import cube
+    import reporting
 
     def station_pollutant_picker(station_or_pollutant) -> int:
         """
@@ -56,9 +54,10 @@ def reporting_menu() -> None:
 
     def date_picker() -> str:
         """
-        Allows user the pick a date in the year 2021, and checks user's date exists.
+        Allows user the pick a date, and checks user's date exists and is in the loaded data.
+        The year is only asked for if the data covers more than one year.
 
-        @return: The user's choice of date in the 2021-MM-DD format
+        @return: The user's choice of date in the YYYY-MM-DD format
         """
 
         import datetime
@@ -85,15 +84,39 @@ def reporting_menu() -> None:
                 else:
                     print('The', formatting[day_or_month][0], 'you have entered is not in the two digit', formatting[day_or_month][1], 
                     'format, or is not valid')
+
+        def year_picker() -> str:
+            """
+            Allows user to pick one of the years in the loaded data
+
+            @return: User's choice of year in the four digit YYYY format
+            """
+
+            if len(years) == 1:
+                return years[0]
+            while True:
+                print('Please input a year in the four digit YYYY format from:', ', '.join(years))
+                user_year = input()
+                if user_year in years:
+                    return user_year
+                print('There is no data for the year you have entered')
             
+        dates = set()
+        for station_data in data.values():
+            dates.update(station_data['date'])
+        years = sorted({date[:4] for date in dates})
         while True:
-            print('Please input a date in the year 2021')
-            user_date = '2021-' + day_month_picker(0) + '-' + day_month_picker(1)
+            year = year_picker()
+            print('Please input a date in the year', year)
+            user_date = year + '-' + day_month_picker(0) + '-' + day_month_picker(1)
             try:
                 datetime.datetime.strptime(user_date, '%Y-%m-%d')
-                return (user_date)
             except:
                 print('The date you have enetered does not exist')
+                continue
+            if user_date in dates:
+                return (user_date)
+            print('There is no data for the date you have entered')
 
     def new_value_picker() -> any:
         """
@@ -106,11 +129,12 @@ def reporting_menu() -> None:
         user_new_value = input()
         return (user_new_value)
     
-    stations = ('Marylebone Road', 'N. Kensington', 'Harlington')
-    pollutants = ('no', 'pm10', 'pm25')
-    submenu_dict = {'1': daily_average, '2': daily_median, '3': hourly_average, '4': monthly_average, '5': peak_hour_date, '6': count_missing_data, '7': fill_missing_data, 'Q': None}
-    #create a dictionary with stations as keys and corresponding raw data as value 
-    data = {k:v for k, v in zip(stations, list(map(lambda station: pd.read_csv(os.path.join(os.path.dirname(__file__), 'data', ('Pollution-London ' + station.replace('.', '') + '.csv')), header = 0, na_values = 'No data'), stations)))}
+    stations = reporting.STATIONS
+    pollutants = reporting.POLLUTANTS
+    submenu_dict = {'1': reporting.daily_average, '2': reporting.daily_median, '3': reporting.hourly_average, '4': reporting.monthly_average, '5': reporting.peak_hour_date, '6': reporting.count_missing_data, '7': reporting.fill_missing_data, 'Q': None}
+    data = reporting.load_data()
+    #statistics are looked up in the precomputed cube until missing values are filled, after which they are computed from data
+    statistics_cube = cube.get_cube(stations, data)
     
     os.system('cls' if os.name == 'nt' else 'clear')
     while True:
@@ -123,22 +147,30 @@ def reporting_menu() -> None:
         elif user_choice == 'Q':
             return
         elif user_choice == '5':
-            print(submenu_dict['5'](data, date_picker(), station_pollutant_picker(0), station_pollutant_picker(1)))
+            arguments = (date_picker(), station_pollutant_picker(0), station_pollutant_picker(1))
+            print(submenu_dict['5'](data, *arguments) if statistics_cube is None else statistics_cube.peak_hour_date(*arguments))
         elif user_choice == '7':
             print(submenu_dict['7'](data, station_pollutant_picker(0), station_pollutant_picker(1), new_value_picker()))
+            statistics_cube = None
         else:
-            print(submenu_dict[user_choice](data, station_pollutant_picker(0), station_pollutant_picker(1)))
+            arguments = (station_pollutant_picker(0), station_pollutant_picker(1))
+            if statistics_cube is None:
+                print(submenu_dict[user_choice](data, *arguments))
+            else:
+                print(statistics_cube.answer(submenu_dict[user_choice].__name__, *arguments))
 
 def monitoring_menu() -> None:
     """
     Prints the real-time monitoring sub-menu interface and allows the user to access functions in monitoring.py
     """
 
+    import monitoring
+
     os.system('cls' if os.name == 'nt' else 'clear')
     while True:
-        submenu_dict ={'1': render_dashboard, '2': render_graph, 'Q': None}
+        submenu_dict ={'1': monitoring.render_dashboard, '2': monitoring.render_graph, '3': monitoring.render_group_dashboard, 'Q': None}
         print('Real-Time Monitoring Reporting Submenu:\nPlease input a number from the list below to select a function, or input Q to return',
-          'to the main menu:\n1 - Live dashboard\n2 - Plot live graphs')
+          'to the main menu:\n1 - Live dashboard\n2 - Plot live graphs\n3 - Live group dashboard')
         user_choice = input().upper()
         if not(user_choice in submenu_dict.keys()):
             print('Your input is not valid')
@@ -146,11 +178,11 @@ def monitoring_menu() -> None:
             return
         else:
             try:
-                submenu_dict[user_choice]
+                submenu_dict[user_choice]()
             except (ConnectionError):
                 print("Connection to the London Air API failed.\nCheck you are connected to the internet and try again.")
             except (TimeoutError):
-                print("Connection timeout to the London Air API")
+                print("Connection timeout to the London Air API.\nCheck you are connected to the internet and try again.")
                 continue
 
 
@@ -175,7 +207,9 @@ def intelligence_menu() -> None:
                 pass
             print('\nYour input is invalid')
 
-    submenu_dict = {'1': find_red_pixels, '2': find_cyan_pixels, '3': detect_connected_components, '4': detect_connected_components_sorted, 'Q': None}
+    import intelligence
+
+    submenu_dict = {'1': intelligence.find_red_pixels, '2': intelligence.find_cyan_pixels, '3': intelligence.detect_connected_components, '4': intelligence.detect_connected_components_sorted, 'Q': None}
 
     os.system('cls' if os.name == 'nt' else 'clear')
     while True:
@@ -231,5 +265,10 @@ def quit() -> None:
 
 
 if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1:
+        import cli
+        sys.exit(cli.main(sys.argv[1:]))
     print('Welcome to the Air Quality Analytics platform')
     main_menu()
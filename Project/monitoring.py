@@ -1,11 +1,94 @@
 import pandas as pd
 import numpy as np
 import os
+import collections
+import threading
+from instrumentation import instrument
+import instrumentation
+try:
+    import orjson as fast_json
+except ImportError:
+    fast_json = None
 pd.options.display.max_rows = 500
 
-def get_live_data_from_api(endpoint: str, site_code = 'MY1', species_code = 'NO', start_date = None, end_date = None, group_name = 'London', air_quality_index = 1) -> dict:
+API_URL = os.environ.get('LONDON_AIR_API_URL', 'https://api.erg.ic.ac.uk/AirQuality')
+API_TIMEOUT = 30
+API_RETRIES = 3
+API_BACKOFF = 0.5
+API_MAX_BACKOFF = 8
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+_dashboard_timings = {}
+_request_stats = {'requests': 0, 'retries': 0, 'failures': 0, 'latencies': collections.deque(maxlen = 1000)}
+#requests are made from worker threads, so the statistics are only read and updated while holding this
+_request_stats_lock = threading.Lock()
+
+def get_session():
+    """
+    Returns the HTTP session shared by all London Air API requests, creating it on first use.
+    Connections are kept alive in the session's pool so repeat requests skip the TCP/TLS handshake.
+
+    @return: A requests.Session with a pooled adapter mounted for http and https
+    """
+
+    import requests
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections = 4, pool_maxsize = 16)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+    return _session
+
+def set_api_url(url: str) -> None:
+    """
+    Changes the base url all London Air API requests are sent to, e.g. to a local replay_server.py
+
+    @param url: Base url without a trailing slash, e.g. 'http://127.0.0.1:8080/AirQuality'
+    """
+
+    global API_URL
+    API_URL = url.rstrip('/')
+
+def get_request_stats() -> dict:
+    """
+    Summarises the latency of recent London Air API requests
+
+    @return: Request, retry and failure counts, and mean/p50/p95/max latency in seconds of the last 1000 responses
+    """
+
+    with _request_stats_lock:
+        latencies = sorted(_request_stats['latencies'])
+        stats = {key: _request_stats[key] for key in ('requests', 'retries', 'failures')}
+    if len(latencies) == 0:
+        return {**stats, 'mean': None, 'p50': None, 'p95': None, 'max': None}
+    return {**stats, 
+        'mean': sum(latencies) / len(latencies), 
+        'p50': latencies[int(0.50 * (len(latencies) - 1))], 
+        'p95': latencies[int(0.95 * (len(latencies) - 1))], 
+        'max': latencies[-1],
+        }
+
+def reset_request_stats() -> None:
+    """
+    Clears all recorded London Air API request statistics
+    """
+
+    with _request_stats_lock:
+        _request_stats['requests'] = 0
+        _request_stats['retries'] = 0
+        _request_stats['failures'] = 0
+        _request_stats['latencies'].clear()
+
+def get_live_data_from_api(endpoint: str, site_code = 'MY1', species_code = 'NO', start_date = None, end_date = None, group_name = 'London', air_quality_index = 1, retries = None, use_cache = True) -> dict:
     """
     Return data from the LondonAir API using its AirQuality API. 
+    Connection errors, timeouts and 429/5xx responses are retried with jittered exponential backoff.
+    Slow-changing /Information/ metadata is served from the response cache (see cache.py).
 
     @param endpoint: An unformatted subdomain to get specific API data
     @param site_code: A code corresponding to a pollution monitoring site
@@ -14,17 +97,22 @@ def get_live_data_from_api(endpoint: str, site_code = 'MY1', species_code = 'NO'
     @param end_date: End of period to recieve data
     @param group_name: The name of a group of pollution monitoring sites
     @param air_quality_index: A number (1-10) indicating severity of pollution
+    @param retries: Number of times to retry a failed request. Defaults to API_RETRIES
+    @param use_cache: If False, metadata endpoints are always downloaded rather than read from the cache
 
     @return: Raw requested json data
+    @raises TimeoutError: If every attempt timed out
+    @raises ConnectionError: If every attempt failed to connect or returned a retryable status code
+    @raises ValueError: If the API returned a non-retryable error or no data
     """
 
-    import requests
     import datetime
+    import cache
 
     start_date = datetime.date.today() if start_date is None else start_date
     end_date = start_date + datetime.timedelta(days=1) if end_date is None else end_date
-    endpoint = 'https://api.erg.ic.ac.uk/AirQuality' + endpoint
-    url = endpoint.format(
+    retries = API_RETRIES if retries is None else retries
+    url = (API_URL + endpoint).format(
         site_code = site_code,
         group_name = group_name,
         species_code = species_code,
@@ -33,17 +121,73 @@ def get_live_data_from_api(endpoint: str, site_code = 'MY1', species_code = 'NO'
         air_quality_index = str(air_quality_index),
         )
     
-    try:
-        response = requests.get(url, timeout = 30)
-        if not response.json() is None:
-            return response.json()
+    ttl = cache.endpoint_ttl(endpoint)
+    if use_cache and ttl is not None:
+        return cache.get_cached(url, ttl, lambda: _fetch_json(url, retries, endpoint))
+    return _fetch_json(url, retries, endpoint)
+
+def _fetch_json(url: str, retries: int, endpoint = '') -> dict:
+    """
+    Downloads and parses a json response from a formatted url, retrying failures (see get_live_data_from_api)
+
+    @param url: Formatted London Air API url
+    @param retries: Number of times to retry a failed request
+    @param endpoint: The unformatted endpoint, used to group requests when profiling
+
+    @return: Raw requested json data
+    @raises: As get_live_data_from_api. Errors are raised rather than printed, as requests are made from worker threads.
+    """
+
+    import requests
+    import random
+    import time
+
+    for attempt in range(retries + 1):
+        if attempt > 0:
+            with _request_stats_lock:
+                _request_stats['retries'] += 1
+            time.sleep(random.uniform(0, min(API_MAX_BACKOFF, API_BACKOFF * 2 ** (attempt - 1))))
+        with _request_stats_lock:
+            _request_stats['requests'] += 1
+        request_start = time.perf_counter()
+        try:
+            response = get_session().get(url, timeout = API_TIMEOUT)
+        except requests.exceptions.Timeout:
+            error = TimeoutError('Connection timeout to the London Air API')
+        except requests.exceptions.ConnectionError:
+            error = ConnectionError('Connection to the London Air API failed')
         else:
-            raise Exception
-    except TimeoutError:
-        print("Connection timeout.\nCheck you are connected to the internet and try again.")
-        raise TimeoutError
-    except:
-        raise Exception
+            error = None
+        if error is not None:
+            if instrumentation.ENABLED:
+                instrumentation.record_http(endpoint, None, 0, time.perf_counter() - request_start)
+            continue
+        latency = time.perf_counter() - request_start
+        with _request_stats_lock:
+            _request_stats['latencies'].append(latency)
+        if instrumentation.ENABLED:
+            instrumentation.record_http(endpoint, response.status_code, len(response.content), latency)
+
+        if response.status_code in RETRY_STATUS_CODES:
+            error = ConnectionError('The London Air API responded with status ' + str(response.status_code))
+            continue
+        if not response.ok:
+            with _request_stats_lock:
+                _request_stats['failures'] += 1
+            raise ValueError('The London Air API responded with status ' + str(response.status_code) + ' for ' + url)
+        try:
+            data = parse_json(response.content)
+        except ValueError:
+            data = None
+        if data is None:
+            with _request_stats_lock:
+                _request_stats['failures'] += 1
+            raise ValueError('The London Air API returned no data for ' + url)
+        return data
+
+    with _request_stats_lock:
+        _request_stats['failures'] += 1
+    raise error
 
 def is_connected() -> bool:
     """
@@ -81,10 +225,47 @@ def unpack_json(json_data: dict, wrappers: list) -> pd.DataFrame:
         json_data = [json_data]
 
     df = pd.DataFrame(json_data)
-    df.columns = [column_name.replace('@','') for column_name in list(df)]
+    df.columns = df.columns.str.replace('@', '', regex = False)
     df.index = np.arange(1, len(df) + 1)
     return df
 
+def parse_json(content: bytes) -> dict:
+    """
+    Parses a json response body, using orjson if it is installed and the standard library otherwise
+
+    @param content: Raw response body
+
+    @return: Parsed json data
+    @raises ValueError: If the body is not valid json
+    """
+
+    import json
+
+    if fast_json is not None:
+        try:
+            return fast_json.loads(content)
+        except fast_json.JSONDecodeError as error:
+            raise ValueError(str(error))
+    return json.loads(content)
+
+@instrument()
+def decode_readings(dates, values) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Converts MeasurementDateGMT and Value columns of a London Air payload into typed arrays in one vectorized pass each.
+    Empty, missing and negative values are masked as NaN.
+
+    @param dates: Sequence of 'YYYY-MM-DD HH:MM:SS' strings
+    @param values: Sequence of numeric strings, floats, '' or None
+
+    @return timestamps: datetime64[s] array of the dates
+    @return readings: float array of the values
+    """
+
+    timestamps = pd.to_datetime(pd.Series(dates, dtype = object), format = '%Y-%m-%d %H:%M:%S').to_numpy(dtype = 'datetime64[s]')
+    readings = pd.to_numeric(pd.Series(values, dtype = object), errors = 'coerce').to_numpy(dtype = float, copy = True)
+    readings[readings < 0] = np.nan
+    return timestamps, readings
+
 def site_code_picker(need_live_data = False, need_group_values_only = False) -> str:
     """
     Allows user to select a monitoring site code from a list and get information about that monitoring site.
@@ -197,11 +378,16 @@ def get_site_code_input() -> str:
             continue
         return user_site_code, group_values
         
-def get_dashboard_data(site_code:str) -> tuple[str, list, list, list, list, int, str, str, list, list]:
+@instrument()
+def get_dashboard_data(site_code:str, previous = None) -> tuple[str, list, list, list, list, int, str, str, list, list]:
     """
-    Retrieves all data displayed on live dashboard
+    Retrieves all data displayed on live dashboard. 
+    The hourly index and raw values are requested concurrently, and the health advice request is started as soon as 
+    the hourly index arrives. A timing breakdown of each refresh is available from get_dashboard_timings().
+    If a previous response is given, raw values are only downloaded once the hourly index shows a new BulletinDate.
 
     @param site_code: Code of monitoring site who's data is being displayed on dashboard
+    @param previous: The last response from get_dashboard_data() for the same site, whose values are reused if the bulletin has not changed
     
     @return site_code: Code of monitoring site who's data is being displayed on dashboard
     @return pollutant_codes: List of codes of all pollutants available from monitoring station
@@ -215,39 +401,134 @@ def get_dashboard_data(site_code:str) -> tuple[str, list, list, list, list, int,
     @return data: Live pollutant values and miscellaneous data (e.g. air quality band of each pollutant) 
     """
 
+    import concurrent.futures
+    import time
+
     if site_code is None:
         return
-    hourly_response = get_live_data_from_api('/Hourly/MonitoringIndex/SiteCode={site_code}/Json', site_code = str(site_code))
-    values_response = get_live_data_from_api('/Data/Site/SiteCode={site_code}/StartDate={start_date}/EndDate={end_date}/json', site_code = str(site_code))
-
-    values_response = unpack_json(values_response, ['AirQualityData','Data'])
-    data = unpack_json(hourly_response, ['HourlyAirQualityIndex', 'LocalAuthority', 'Site', 'species'])
-    pollutant_codes = list(dict.fromkeys(list(data['SpeciesCode'])))
-    pollutant_names = list(data['SpeciesName'])
-    live_pollutant_values = list(map(lambda pollutant: values_response.loc[values_response['SpeciesCode'] == pollutant].iloc[-1]['Value'], pollutant_codes))
-    latest_pollutant_values = list(map(lambda pollutant: get_latest_values(values_response, pollutant), pollutant_codes))
-
-    max_air_quality_index = max(data['AirQualityIndex'])
-    if max_air_quality_index == '0':
-        advice = 'No Data'
-    else:
-        advice = unpack_json(get_live_data_from_api('/Information/IndexHealthAdvice/AirQualityIndex={air_quality_index}/Json', air_quality_index = max_air_quality_index), ['AirQualityIndexHealthAdvice','AirQualityBanding','HealthAdvice'])
-    site_name = unpack_json(hourly_response, ['HourlyAirQualityIndex', 'LocalAuthority', 'Site'])['SiteName'][1]
-    date_and_time = unpack_json(hourly_response, ['HourlyAirQualityIndex', 'LocalAuthority', 'Site'])['BulletinDate'][1]
+    timings = {}
+    refresh_start = time.perf_counter()
+
+    def timed(name, function, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = 3) as executor:
+        hourly_future = executor.submit(timed, 'index', get_live_data_from_api, '/Hourly/MonitoringIndex/SiteCode={site_code}/Json', site_code = str(site_code))
+        values_request = (timed, 'values', get_live_data_from_api, '/Data/Site/SiteCode={site_code}/StartDate={start_date}/EndDate={end_date}/json')
+        values_future = None if previous is not None else executor.submit(*values_request, site_code = str(site_code))
+
+        hourly_response = hourly_future.result()
+        data = unpack_json(hourly_response, ['HourlyAirQualityIndex', 'LocalAuthority', 'Site', 'species'])
+        site = unpack_json(hourly_response, ['HourlyAirQualityIndex', 'LocalAuthority', 'Site'])
+        site_name = site['SiteName'][1]
+        date_and_time = site['BulletinDate'][1]
+        pollutant_codes = list(dict.fromkeys(list(data['SpeciesCode'])))
+        pollutant_names = list(data['SpeciesName'])
+        if values_future is None and (date_and_time != previous[8] or pollutant_codes != previous[1]):
+            values_future = executor.submit(*values_request, site_code = str(site_code))
+
+        max_air_quality_index = max(data['AirQualityIndex'])
+        if max_air_quality_index == '0':
+            advice_future = None
+        else:
+            advice_future = executor.submit(timed, 'advice', get_live_data_from_api, '/Information/IndexHealthAdvice/AirQualityIndex={air_quality_index}/Json', air_quality_index = max_air_quality_index)
+
+        if values_future is None:
+            live_pollutant_values, latest_pollutant_values = previous[3], previous[4]
+        else:
+            values_response = unpack_json(values_future.result(), ['AirQualityData','Data'])
+            live_values, latest_values = get_latest_values(values_response)
+            live_pollutant_values = [live_values.get(pollutant, '') for pollutant in pollutant_codes]
+            latest_pollutant_values = [latest_values.get(pollutant, 'No Data') for pollutant in pollutant_codes]
+
+        if advice_future is None:
+            advice = 'No Data'
+        else:
+            advice = unpack_json(advice_future.result(), ['AirQualityIndexHealthAdvice','AirQualityBanding','HealthAdvice'])
+
+    timings['total'] = time.perf_counter() - refresh_start
+    _dashboard_timings.clear()
+    _dashboard_timings.update(timings)
     return(site_code, pollutant_codes, pollutant_names, live_pollutant_values, latest_pollutant_values, max_air_quality_index, advice, site_name, date_and_time, data)
 
-def get_latest_values(values_response: pd.DataFrame, pollutant_code):
-    """Your documentation goes here"""
-    for i in range(len(values_response.loc[values_response['SpeciesCode'] == pollutant_code])):
-        value = values_response.loc[values_response['SpeciesCode'] == pollutant_code].iloc[-(i+1)]['Value']
-        date_collected = values_response.loc[values_response['SpeciesCode'] == pollutant_code].iloc[-(i+1)]['MeasurementDateGMT']
-        if value != '':
-            return (value, date_collected)
-    return 'No Data'
+def get_dashboard_timings() -> dict:
+    """
+    Gets the timing breakdown of the most recent get_dashboard_data() call
+
+    @return: Seconds spent on the 'index', 'values' and 'advice' requests (each measured from when it was issued), and the 'total' refresh time
+    """
+
+    return dict(_dashboard_timings)
+
+def get_latest_values(values_response: pd.DataFrame|None) -> tuple[dict, dict]:
+    """
+    Finds the live and latest non-empty value of every pollutant in a single grouped pass over the values payload
+
+    @param values_response: Unpacked /Data/Site/ payload with SpeciesCode, MeasurementDateGMT and Value columns, or None if it was empty
+
+    @return live_values: The most recent value (possibly '') of each pollutant, keyed by pollutant code
+    @return latest_values: The most recent non-empty value and the date/time it was collected, keyed by pollutant code. 
+    Pollutants with no values at all are left out.
+    """
+
+    if values_response is None or len(values_response) == 0:
+        return {}, {}
+    has_value = values_response['Value'] != ''
+    #GroupBy.last() skips nulls, so masking empty readings makes ValidValue/ValidDate the latest non-empty reading
+    grouped = pd.DataFrame({
+        'SpeciesCode': values_response['SpeciesCode'],
+        'Value': values_response['Value'],
+        'ValidValue': values_response['Value'].where(has_value),
+        'ValidDate': values_response['MeasurementDateGMT'].where(has_value),
+        }).groupby('SpeciesCode', sort = False).last()
+
+    live_values = grouped['Value'].to_dict()
+    latest_values = {code: (row.ValidValue, row.ValidDate) for code, row in grouped.loc[grouped['ValidValue'].notna()].iterrows()}
+    return live_values, latest_values
+
+DASHBOARD_REFRESH_INTERVAL = 60
+AIR_QUALITY_BANDS = {0:'No Data', 1: 'Low', 2: 'Low', 3: 'Low', 4: 'Moderate', 5: 'Moderate', 6: 'Moderate', 7: 'High', 8: 'High', 9: 'High', 10:'Very Low'}
+
+def format_dashboard(response: tuple, last_updated: str) -> list[str]:
+    """
+    Lays out data from get_dashboard_data() as the lines of the live dashboard
+
+    @param response: A response from get_dashboard_data()
+    @param last_updated: Time the data was retrieved, displayed on the dashboard
+
+    @return: The dashboard as a list of lines without newlines
+    """
+
+    site_code, pollutant_codes, pollutant_names, live_pollutant_values, latest_pollutant_values, max_air_quality_index, advice, site_name, date_and_time, data = response
+    lines = ['', 'WELCOME TO THE REAL-TIME MONITORING DASHBOARD', '']
+    lines.append('DATA COLLECTED: ' + str(date_and_time) + ' ' * 10 + 'LAST UPDATED: ' + last_updated + ' ' +
+    ' ' * 10 + 'SITE NAME: '+ site_name + ' ' * 10 + 'SITE CODE: '+ site_code)
+    lines.extend(['', 'CURRENT POLLUTANT LEVELS:'])
+    for i in range(len(pollutant_codes)):
+        if live_pollutant_values[i] != '':
+            pollutant_value = (str(live_pollutant_values[i]) + ' ('+  str(date_and_time) + ')') 
+        elif latest_pollutant_values[i] == 'No Data':
+            pollutant_value = 'No Data'
+        else:
+            pollutant_value = str(latest_pollutant_values[i][0]) + ' (' + str(latest_pollutant_values[i][1]) +')'
+        lines.append(str(pollutant_names[i]) + ' (' + str(list(pollutant_codes)[i]) + ') - ' + pollutant_value + ' (' + str(data['AirQualityBand'][i+1]) + ')')
+    lines.extend(['', 'MAXIMUM AIR QUALITY INDEX: ' + str(max_air_quality_index) + ' (' + AIR_QUALITY_BANDS[int(max_air_quality_index)] + ')'])
+    lines.append('CORRESPONDING ADVICE:')
+    if advice is None or (type(advice) is str and advice == 'No Data'):
+        lines.append('No advice available')
+    else:
+        for i in range(len(advice)):
+            lines.append(advice['Population'][i+1] + ': ' + advice['Advice'][i+1])
+    return lines
 
 def render_dashboard() -> None:
     """
-    Prints data from get_dashboard_data(). Allows user to refresh data and choose to graph live values against historic data.
+    Prints data from get_dashboard_data(). Allows user to refresh data, switch to an auto-refreshing live mode, 
+    and choose to graph live values against historic data.
 
     @return: None if user quits
     """
@@ -257,45 +538,130 @@ def render_dashboard() -> None:
         response = get_dashboard_data(get_site_code_input()[0])
         if response is None:
             return 
-        else:  
-            site_code, pollutant_codes, pollutant_names, live_pollutant_values, latest_pollutant_values, max_air_quality_index, advice, site_name, date_and_time, data = response
-            air_quality_bands = {0:'No Data', 1: 'Low', 2: 'Low', 3: 'Low', 4: 'Moderate', 5: 'Moderate', 6: 'Moderate', 7: 'High', 8: 'High', 9: 'High', 10:'Very Low'}
+        last_updated = str(datetime.now())[11:19]
         os.system('cls' if os.name == 'nt' else 'clear')
         
         while True:
             os.system('cls' if os.name == 'nt' else 'clear')
-            print('\nWELCOME TO THE REAL-TIME MONITORING DASHBOARD\n')
-            print('DATA COLLECTED: ' + str(date_and_time) + ' ' * 10 + 'LAST UPDATED: ' + str(datetime.now())[11:19],
-            ' ' * 10 + 'SITE NAME: '+ site_name + ' ' * 10 + 'SITE CODE: '+ site_code)
-            print('\nCURRENT POLLUTANT LEVELS:')
-            for i in range(len(pollutant_codes)):
-                if live_pollutant_values[i] != '':
-                    pollutant_value = (str(live_pollutant_values[i]) + ' ('+  str(date_and_time) + ')') 
-                elif all([value == 'No Data' for value in latest_pollutant_values]):
-                    pollutant_value = 'No Data'
-                else:
-                    pollutant_value = str(latest_pollutant_values[i][0]) + ' (' + str(latest_pollutant_values[i][1]) +')'
-                print(str(pollutant_names[i]) + ' (' + str(list(pollutant_codes)[i]) + ') - ' + pollutant_value + ' (' + str(data['AirQualityBand'][i+1]) + ')')
-            print('\nMAXIMUM AIR QUALITY INDEX: ' + str(max_air_quality_index) + ' (' + air_quality_bands[int(max_air_quality_index)] + ')')
-            print('CORRESPONDING ADVICE:')
-            if advice is None or (type(advice) is str and advice == 'No Data'):
-                print('No advice available')
-            else:
-                for i in range(len(advice)):
-                    print(advice['Population'][i+1] + ': ' + advice['Advice'][i+1])
-            user_choice = input('\nInput "N" to select a new monitoring site, "G" to access site graph, "Q" to quit, or any other key to refresh the dashboard\n')
+            print('\n'.join(format_dashboard(response, last_updated)))
+            user_choice = input('\nInput "N" to select a new monitoring site, "G" to access site graph, "L" to refresh automatically, "Q" to quit, or any other key to refresh the dashboard\n')
+            if user_choice.upper() == 'L':
+                user_choice = render_live_dashboard(response)
             if user_choice.upper() == 'Q':
                 return
             elif user_choice.upper() == 'N':
                 break   
             elif user_choice.upper() == 'G':
-                dashboard_to_graph(site_code, pollutant_codes, live_pollutant_values, latest_pollutant_values, pollutant_names, date_and_time)
+                dashboard_to_graph(response[0], response[1], response[3], response[4], response[2], response[8])
                 continue 
-            response = get_dashboard_data(site_code)[1:]
-            if response is None:
-                return
-            pollutant_codes, pollutant_names, live_pollutant_values, latest_pollutant_values, max_air_quality_index, advice, site_name, date_and_time, data = response
-            continue
+            response = get_dashboard_data(response[0])
+            last_updated = str(datetime.now())[11:19]
+
+def render_live_dashboard(response: tuple, interval = DASHBOARD_REFRESH_INTERVAL) -> str:
+    """
+    Shows an auto-refreshing dashboard. A background thread polls get_dashboard_data() every interval seconds, 
+    downloading raw values only when the bulletin changes, while the terminal keeps accepting N/G/Q. 
+    Only lines that changed are redrawn.
+
+    @param response: The current response from get_dashboard_data()
+    @param interval: Seconds between refreshes
+
+    @return: 'N' if the user wants a new monitoring site, or 'Q' to quit
+    """
+
+    import queue
+    from datetime import datetime
+
+    updates = queue.Queue()
+    stop = threading.Event()
+
+    def poll(previous):
+        while not stop.wait(interval):
+            try:
+                previous = get_dashboard_data(previous[0], previous = previous)
+                updates.put((previous, str(datetime.now())[11:19]))
+            except Exception as error:
+                updates.put((error, None))
+
+    poller = threading.Thread(target = poll, args = (response,), daemon = True)
+    poller.start()
+    last_updated = str(datetime.now())[11:19]
+    status = ''
+    drawn = None
+    try:
+        while True:
+            lines = format_dashboard(response, last_updated) + ['', 'LIVE MODE: refreshing every ' + str(interval) + 's' + status,
+            'Input "N" to select a new monitoring site, "G" to access site graph or "Q" to quit, then press enter']
+            drawn = redraw_lines(drawn, lines)
+            while True:
+                user_choice = read_key(0.2)
+                if user_choice is not None or not updates.empty():
+                    break
+            if user_choice is not None:
+                if user_choice.upper() in ('N', 'Q'):
+                    return user_choice.upper()
+                elif user_choice.upper() == 'G':
+                    dashboard_to_graph(response[0], response[1], response[3], response[4], response[2], response[8])
+                    drawn = None
+                continue
+            update, updated_at = updates.get()
+            if isinstance(update, Exception):
+                status = ' (last refresh failed: ' + str(update) + ')'
+            else:
+                response, last_updated, status = update, updated_at, ''
+    finally:
+        stop.set()
+
+def redraw_lines(drawn: list[str]|None, lines: list[str]) -> list[str]:
+    """
+    Updates the terminal to show lines, rewriting only the lines that differ from what is already drawn
+
+    @param drawn: The lines currently on screen, or None to clear the screen and draw everything
+    @param lines: The lines to show
+
+    @return: lines, to be passed back as drawn on the next call
+    """
+
+    import sys
+
+    if drawn is None:
+        os.system('cls' if os.name == 'nt' else 'clear')
+        drawn = []
+    output = []
+    for row in range(max(len(lines), len(drawn))):
+        line = lines[row] if row < len(lines) else ''
+        if row >= len(drawn) or drawn[row] != line:
+            #move the cursor to the start of the row and clear it
+            output.append('\x1b[' + str(row + 1) + ';1H\x1b[2K' + line)
+    output.append('\x1b[' + str(len(lines) + 1) + ';1H')
+    sys.stdout.write(''.join(output))
+    sys.stdout.flush()
+    return lines
+
+def read_key(timeout: float) -> str|None:
+    """
+    Waits up to timeout seconds for user input without blocking the dashboard
+
+    @param timeout: Maximum time to wait in seconds
+
+    @return: The line (or on Windows, key) the user entered, or None if nothing was entered
+    """
+
+    import sys
+    import time
+
+    if os.name == 'nt':
+        import msvcrt
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if msvcrt.kbhit():
+                return msvcrt.getwch()
+            time.sleep(0.02)
+        return None
+    import select
+    if select.select([sys.stdin], [], [], timeout)[0]:
+        return sys.stdin.readline().strip()
+    return None
 
 def dashboard_to_graph(site_code: str, pollutant_codes: list, live_pollutant_values: list, latest_pollutant_values: list, pollutant_names: list, date_and_time: str) -> None:
     '''
@@ -341,6 +707,111 @@ def dashboard_to_graph(site_code: str, pollutant_codes: list, live_pollutant_val
     render_graph((user_pollutant_values[2], site_code + " live data"), user_pollutant_values[1])
     return
 
+@instrument()
+def get_group_dashboard_data(group_name: str, max_concurrency = 8, retries = 1) -> tuple[list[dict], list[str], list[str]]:
+    """
+    Retrieves the hourly air quality index of every operating monitoring site in a group. 
+    Sites are requested concurrently, at most max_concurrency at a time, so a group refreshes in roughly the time of its slowest request.
+
+    @param group_name: The name of a group of pollution monitoring sites, e.g. 'London'
+    @param max_concurrency: The maximum number of requests in flight at once
+    @param retries: Number of times to retry each site's request
+
+    @return rows: One dict per site (site code, site name, bulletin date, maximum index, its band and pollutant), worst index first
+    @return timed_out: Site codes whose request timed out
+    @return failed: Site codes whose request failed for any other reason, or returned no index
+    """
+
+    import concurrent.futures
+
+    sites = unpack_json(get_live_data_from_api('/Information/MonitoringSites/GroupName={group_name}/Json', group_name = group_name), ['Sites', 'Site'])
+    if sites is None:
+        return [], [], []
+    site_codes = list(sites.loc[sites['DateClosed'] == '']['SiteCode'])
+
+    rows = []
+    timed_out = []
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers = max(1, max_concurrency)) as executor:
+        futures = {executor.submit(get_live_data_from_api, '/Hourly/MonitoringIndex/SiteCode={site_code}/Json', site_code = site_code, retries = retries): site_code for site_code in site_codes}
+        for future in concurrent.futures.as_completed(futures):
+            site_code = futures[future]
+            try:
+                row = summarise_site_index(future.result())
+            except TimeoutError:
+                timed_out.append(site_code)
+                continue
+            except Exception:
+                failed.append(site_code)
+                continue
+            if row is None:
+                failed.append(site_code)
+            else:
+                rows.append(row)
+    rows.sort(key = lambda row: (-row['AirQualityIndex'], row['SiteCode']))
+    return rows, sorted(timed_out), sorted(failed)
+
+def summarise_site_index(hourly_response: dict) -> dict|None:
+    """
+    Reduces a /Hourly/MonitoringIndex/SiteCode= response to the site's worst pollutant
+
+    @param hourly_response: Raw json from the hourly monitoring index endpoint for one site
+
+    @return: Site code, site name, bulletin date, maximum air quality index, its band and the pollutant responsible
+    @return: None if the site reported no pollutants
+    """
+
+    site = unpack_json(hourly_response, ['HourlyAirQualityIndex', 'LocalAuthority', 'Site'])
+    species = unpack_json(hourly_response, ['HourlyAirQualityIndex', 'LocalAuthority', 'Site', 'species'])
+    if site is None or species is None or 'AirQualityIndex' not in species:
+        return
+    species['AirQualityIndex'] = species['AirQualityIndex'].astype(int)
+    worst = species.loc[species['AirQualityIndex'].idxmax()]
+    return {
+        'SiteCode': site['SiteCode'][1],
+        'SiteName': site['SiteName'][1],
+        'BulletinDate': site['BulletinDate'][1],
+        'AirQualityIndex': int(worst['AirQualityIndex']),
+        'AirQualityBand': worst['AirQualityBand'],
+        'SpeciesCode': worst['SpeciesCode'],
+        }
+
+def render_group_dashboard(max_concurrency = 8) -> None:
+    """
+    Prints the hourly air quality index of every site in a monitoring site group, worst first. Allows user to refresh data.
+
+    @param max_concurrency: The maximum number of site requests in flight at once
+
+    @return: None if user quits
+    """
+
+    from datetime import datetime
+    import time
+
+    group_name = group_name_picker()
+    if group_name is None:
+        return
+    while True:
+        refresh_start = time.perf_counter()
+        rows, timed_out, failed = get_group_dashboard_data(group_name, max_concurrency = max_concurrency)
+        refresh_time = time.perf_counter() - refresh_start
+        os.system('cls' if os.name == 'nt' else 'clear')
+        print('\nGROUP DASHBOARD: ' + group_name.upper() + ' ' * 10 + 'LAST UPDATED: ' + str(datetime.now())[11:19] +
+        ' ' * 10 + 'REFRESH TIME: ' + str(round(refresh_time, 2)) + 's\n')
+        if len(rows) == 0:
+            print('No air quality indexes are available for this group')
+        else:
+            table = pd.DataFrame(rows)[['SiteName', 'SiteCode', 'AirQualityIndex', 'AirQualityBand', 'SpeciesCode', 'BulletinDate']]
+            table.index = np.arange(1, len(table) + 1)
+            print(table)
+        if len(timed_out) > 0:
+            print('\nTIMED OUT: ' + ', '.join(timed_out))
+        if len(failed) > 0:
+            print('\nNO DATA: ' + ', '.join(failed))
+        user_choice = input('\nInput "Q" to quit, or any other key to refresh the dashboard\n')
+        if user_choice.upper() == 'Q':
+            return
+
 def get_graph_parameters(used_site_codes:list, pollutant_code:str, start_date, end_date):
 
     '''
@@ -514,6 +985,119 @@ def graph_date_range_picker(max_date, min_date, start_date, end_date):
             break
     return (start_date, end_date)
 
+CHUNK_DAYS = 31
+CHUNK_WORKERS = 6
+
+def split_date_range(start_date, end_date, chunk_days = CHUNK_DAYS) -> list[tuple]:
+    """
+    Splits a date range into consecutive windows of at most chunk_days days
+
+    @param start_date: Start of the range in datetime.date() type
+    @param end_date: End of the range in datetime.date() type
+    @param chunk_days: Length of each window in days
+
+    @return: A list of (window start, window end) tuples in time order. Each window ends where the next starts.
+    """
+
+    import datetime
+
+    windows = []
+    window_start = start_date
+    while window_start < end_date:
+        window_end = min(window_start + datetime.timedelta(days = chunk_days), end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+@instrument()
+def fetch_site_species(site_code: str, species_code: str, start_date, end_date, chunk_days = CHUNK_DAYS, max_workers = CHUNK_WORKERS, show_progress = True) -> tuple[pd.DataFrame, list[tuple]]:
+    """
+    Downloads raw readings of one pollutant at one monitoring site. The date range is split into windows of chunk_days 
+    which are fetched in parallel (each retried by get_live_data_from_api) and stitched back together in time order.
+
+    @param site_code: A code corresponding to a pollution monitoring site
+    @param species_code: A code corresponding to a monitored pollutant
+    @param start_date: Start of period to recieve data
+    @param end_date: End of period to recieve data
+    @param chunk_days: Length of each requested window in days
+    @param max_workers: The maximum number of windows requested at once
+    @param show_progress: If True, the number of windows fetched is printed as they complete
+
+    @return data: DataFrame of MeasurementDateGMT and Value strings with one row per timestamp, in time order
+    @return failed_windows: (start, end) of every window that could not be fetched
+    @raises: The last window's error if every window failed
+    """
+
+    import concurrent.futures
+
+    windows = split_date_range(start_date, end_date, chunk_days)
+    chunks = {}
+    failed_windows = []
+    error = None
+    with concurrent.futures.ThreadPoolExecutor(max_workers = max(1, max_workers)) as executor:
+        futures = {executor.submit(get_live_data_from_api, '/Data/SiteSpecies/SiteCode={site_code}/SpeciesCode={species_code}/StartDate={start_date}/EndDate={end_date}/Json',
+        site_code = site_code, species_code = species_code, start_date = window_start, end_date = window_end): (window_start, window_end) for window_start, window_end in windows}
+        for completed, future in enumerate(concurrent.futures.as_completed(futures), start = 1):
+            try:
+                chunks[futures[future]] = unpack_json(future.result(), ['RawAQData', 'Data'])
+            except Exception as exception:
+                error = exception
+                failed_windows.append(futures[future])
+            if show_progress:
+                print('\rFetching data: ' + str(completed) + '/' + str(len(windows)) + ' periods downloaded', end = '', flush = True)
+    if show_progress:
+        print()
+    if len(windows) > 0 and len(failed_windows) == len(windows):
+        raise error
+
+    frames = [chunks[window] for window in sorted(chunks) if chunks[window] is not None]
+    if len(frames) == 0:
+        return pd.DataFrame({'MeasurementDateGMT': pd.Series(dtype = str), 'Value': pd.Series(dtype = str)}), sorted(failed_windows)
+    data = pd.concat(frames)[['MeasurementDateGMT', 'Value']]
+    data = data.drop_duplicates(subset = 'MeasurementDateGMT', keep = 'first').sort_values('MeasurementDateGMT')
+    data.index = np.arange(1, len(data) + 1)
+    return data, sorted(failed_windows)
+
+@instrument()
+def get_stored_site_species(site_code: str, species_code: str, start_date, end_date, show_progress = True) -> tuple[pd.DataFrame, list[tuple]]:
+    """
+    Gets raw readings of one pollutant at one monitoring site from the local time-series store (see store.py).
+    Only the parts of the range missing from the store are downloaded, and they are merged into the store before reading.
+
+    @param site_code: A code corresponding to a pollution monitoring site
+    @param species_code: A code corresponding to a monitored pollutant
+    @param start_date: Start of period to recieve data
+    @param end_date: End of period to recieve data
+    @param show_progress: If True, download progress is printed
+
+    @return data: DataFrame of MeasurementDateGMT strings and float Values (NaN where the API had no value), in time order
+    @return failed_windows: (start, end) of every window that could not be fetched
+    @raises: The download error if nothing could be fetched and nothing was already stored
+    """
+
+    import store
+
+    failed_windows = []
+    error = None
+    for interval_start, interval_end in store.missing_intervals(site_code, species_code, start_date, end_date):
+        try:
+            data, failed = fetch_site_species(site_code, species_code, interval_start, interval_end, show_progress = show_progress)
+        except Exception as exception:
+            error = exception
+            failed_windows.append((interval_start, interval_end))
+            continue
+        covered = [window for window in split_date_range(interval_start, interval_end) if window not in failed]
+        store.save_readings(site_code, species_code, data, covered)
+        failed_windows.extend(failed)
+
+    rows = store.load_readings(site_code, species_code, start_date, end_date)
+    if len(rows) == 0 and error is not None:
+        raise error
+    data = pd.DataFrame(rows, columns = ['MeasurementDateGMT', 'Value'])
+    data['Value'] = data['Value'].astype(float)
+    data.index = np.arange(1, len(data) + 1)
+    return data, failed_windows
+
 def get_graph_data(used_site_codes = [], pollutant_code = None, start_date = None, end_date = None) -> tuple[str,str,any,any,list[list, list, str]]:
     '''
     @param used_site_codes: A list of site codes of sites currently being displayed on the graph
@@ -524,24 +1108,60 @@ def get_graph_data(used_site_codes = [], pollutant_code = None, start_date = Non
     @return: Name and code of pollutant to display, date range of data, and x and y values to plot
     '''
 
-    from datetime import datetime
     response = get_graph_parameters(used_site_codes, pollutant_code, start_date, end_date)
     if response is None:
         return
     site_code, used_site_codes, pollutant_name, pollutant_code, start_date, end_date = response
     os.system('cls' if os.name == 'nt' else 'clear')
-    print('Fetching data. This may take some time.')
-    data = get_live_data_from_api('/Data/SiteSpecies/SiteCode={site_code}/SpeciesCode={species_code}/StartDate={start_date}/EndDate={end_date}/Json',
-    site_code = site_code, species_code = pollutant_code, start_date = start_date, end_date = end_date)
-    data = unpack_json(data, ['RawAQData', 'Data'])
-    x_values = list(map(lambda value: datetime.strptime(value, '%Y-%m-%d %H:%M:%S'), data['MeasurementDateGMT']))
-    y_values = data['Value'].replace('', np.nan).to_numpy(dtype = float)
-    y_values[y_values < 0] = np.nan
+    data, failed_windows = get_stored_site_species(site_code, pollutant_code, start_date, end_date)
+    if len(failed_windows) > 0:
+        print('Data could not be fetched for ' + ', '.join([str(start) + ' to ' + str(end) for start, end in failed_windows]) + 
+        '. These periods will be missing from the graph.')
+    x_values, y_values = decode_readings(data['MeasurementDateGMT'], data['Value'])
     return(pollutant_name, pollutant_code, start_date, end_date, [x_values, y_values, site_code])
 
+def decimate_minmax(x_values: np.ndarray, y_values: np.ndarray, x_min, x_max, n_bins: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reduces a series to the minimum and maximum point of each of n_bins equal slices of the visible range, so a plot
+    n_bins pixels wide looks the same as the full resolution series. Slices are equal spans of time, so a stretch with
+    few readings is not widened on the plot. Slices whose readings are all missing keep a NaN to preserve gaps.
+
+    @param x_values: Sorted datetime64 timestamps
+    @param y_values: Float values, NaN where missing
+    @param x_min: Left edge of the view, as datetime64
+    @param x_max: Right edge of the view, as datetime64
+    @param n_bins: Number of slices, normally the width of the axes in pixels
+
+    @return: Decimated timestamps and values in time order
+    """
+
+    #keep one point either side of the view so lines run off the edges
+    start = max(np.searchsorted(x_values, x_min) - 1, 0)
+    end = min(np.searchsorted(x_values, x_max, side = 'right') + 1, len(x_values))
+    x_values = x_values[start:end]
+    y_values = y_values[start:end]
+    n_bins = max(int(n_bins), 1)
+    if len(x_values) <= 2 * n_bins or not x_max > x_min:
+        return x_values, y_values
+
+    #x_values are sorted, so each slice's points are one contiguous run
+    bins = np.clip(((x_values - x_min) / (x_max - x_min) * n_bins).astype(np.int64), 0, n_bins - 1)
+    starts = np.flatnonzero(np.concatenate(([True], bins[1:] != bins[:-1])))
+    groups = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(bins))))
+    lows = np.where(np.isnan(y_values), np.inf, y_values)
+    highs = np.where(np.isnan(y_values), -np.inf, y_values)
+    #the first point of each slice equal to its minimum or maximum
+    minimums = np.flatnonzero(lows == np.minimum.reduceat(lows, starts)[groups])
+    minimums = minimums[np.unique(groups[minimums], return_index = True)[1]]
+    maximums = np.flatnonzero(highs == np.maximum.reduceat(highs, starts)[groups])
+    maximums = maximums[np.unique(groups[maximums], return_index = True)[1]]
+    indexes = np.unique(np.concatenate((minimums, maximums, [0, len(y_values) - 1])))
+    return x_values[indexes], y_values[indexes]
+
 def render_graph(line = None, pollutant_code = None) -> None:
     """
-    Displays a graph from data recieved
+    Displays a graph from data recieved. Series are decimated to the width of the plot before drawing, and again whenever 
+    the view is zoomed or panned. Adding a monitoring site adds one line to the open graph.
 
     @param line: The x and y values of a line retrieved from live dashboard. Optional if no dashboard data to display
     @param pollutant_code: The pollutant code retrieved from dashboard. Optional if no dashboard data to display
@@ -554,30 +1174,53 @@ def render_graph(line = None, pollutant_code = None) -> None:
     if response is None:
         return
     pollutant_name, pollutant_code, start_date, end_date = response[:4]
-    data = [response[-1]]
-    used_site_codes = [response[-1][-1]]
+    used_site_codes = [response[-1][2]]
+
+    figure, axes = plt.subplots()
+    series = []
+
+    def redraw_series(axes) -> None:
+        #xlim_changed fires on every zoom and pan, so only the visible range is decimated each time
+        x_min, x_max = [np.datetime64(matplotlib.dates.num2date(limit).replace(tzinfo = None), 's') for limit in axes.get_xlim()]
+        for artist, x_values, y_values in series:
+            artist.set_data(*decimate_minmax(x_values, y_values, x_min, x_max, axes.bbox.width))
+
+    def add_series(x_values, y_values, site_code) -> None:
+        x_values = np.asarray(x_values, dtype = 'datetime64[s]')
+        y_values = np.asarray(y_values, dtype = float)
+        x_dec, y_dec = decimate_minmax(x_values, y_values, x_values[0], x_values[-1], axes.bbox.width) if len(x_values) > 0 else (x_values, y_values)
+        artist, = axes.plot(x_dec, y_dec, marker = 'o', markersize = 2, linestyle = '', label = site_code)
+        series.append((artist, x_values, y_values))
+        axes.relim()
+        axes.autoscale_view()
+        axes.legend()
+        figure.canvas.draw_idle()
+
     if not line is None:
-        plt.plot_date(matplotlib.dates.date2num([data[0][0][-0], data[0][0][-1]]), (line[0], line[0]), color='r', linestyle='--', label = line[1])
+        axes.axhline(float(line[0]), color='r', linestyle='--', label = line[1])
+    add_series(*response[-1])
+    axes.set_xlabel('Time')
+    axes.set_ylabel(str(pollutant_name.iloc[0]) + ' Level')
+    axes.set_title(str(pollutant_name.iloc[0]) + ' Levels Over Time')
+    axes.callbacks.connect('xlim_changed', redraw_series)
+    plt.show(block = False)
+
     while True:
-        for i in range(len(data)):
-            plt.plot_date(matplotlib.dates.date2num(data[i][0]), data[i][1], label = data[i][2])
-        plt.xlabel('Time')
-        plt.ylabel(str(pollutant_name.iloc[0]) + ' Level')
-        plt.title(str(pollutant_name.iloc[0]) + ' Levels Over Time')
-        plt.legend()
-        plt.show()
-        while True:
-            print('Input "N" to add new monitoring site data, or input "Q" to quit')
-            user_choice = input()
-            print(user_choice.upper == 'Q')
-            if user_choice.upper() == 'N':
-                response = get_graph_data(used_site_codes = used_site_codes, pollutant_code = pollutant_code, start_date = start_date, end_date = end_date)
-                if response is None:
-                    return
-                data.append(response[-1])
-                used_site_codes = [response[-1][2]]
-                continue
-            elif user_choice.upper() != 'Q':
-                os.system('cls' if os.name == 'nt' else 'clear')
-                print('Your input is invalid')
-            return
\ No newline at end of file
+        print('Input "N" to add new monitoring site data, or input "Q" to quit')
+        user_choice = None
+        while user_choice is None:
+            #keep the graph window responsive while waiting for input
+            plt.pause(0.1)
+            user_choice = read_key(0)
+        if user_choice.upper() == 'N':
+            response = get_graph_data(used_site_codes = used_site_codes, pollutant_code = pollutant_code, start_date = start_date, end_date = end_date)
+            if response is None:
+                break
+            #get_graph_parameters() has already added the new site to used_site_codes
+            add_series(*response[-1])
+        elif user_choice.upper() == 'Q':
+            break
+        else:
+            os.system('cls' if os.name == 'nt' else 'clear')
+            print('Your input is invalid')
+    plt.close(figure)
@@ -0,0 +1,253 @@
+"""
+A local stand-in for the London Air API that replays recorded JSON responses, used to test and benchmark monitoring.py offline.
+
+Static endpoints (groups, monitoring sites, hourly indexes, health advice) are served from the recorded files in data/replay,
+named after the request path with '/' replaced by '_'. Raw readings (/Data/Site/ and /Data/SiteSpecies/) are generated
+deterministically for whatever date range is requested. Latency, error responses and timeouts can be injected.
+
+Usage: python replay_server.py [--port 8080] [--latency 0.05] [--jitter 0.02] [--error-rate 0.01] [--timeout-rate 0.0]
+       python replay_server.py --record /Information/Groups/Json [more paths ...]
+Then point monitoring at it with monitoring.set_api_url() or the LONDON_AIR_API_URL environment variable.
+"""
+
+import argparse
+import collections
+import datetime
+import http.server
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+import zlib
+
+REPLAY_DIR = os.path.join(os.path.dirname(__file__), 'data', 'replay')
+BASE_PATH = '/AirQuality'
+REMOTE_API_URL = 'https://api.erg.ic.ac.uk/AirQuality'
+#typical hourly levels used to generate readings for each species
+SPECIES_LEVELS = {'NO2': 40.0, 'NO': 25.0, 'O3': 35.0, 'PM10': 20.0, 'PM25': 12.0, 'SO2': 3.0, 'CO': 0.3}
+
+SITE_DATA = re.compile(r'^/Data/Site/SiteCode=(\w+)/StartDate=([\d-]+)/EndDate=([\d-]+)/json$', re.IGNORECASE)
+SITE_SPECIES_DATA = re.compile(r'^/Data/SiteSpecies/SiteCode=(\w+)/SpeciesCode=(\w+)/StartDate=([\d-]+)/EndDate=([\d-]+)/json$', re.IGNORECASE)
+
+
+def fixture_name(path: str) -> str:
+    """
+    Gets the name of the recorded file for a request path, e.g. '/Information/Groups/Json' -> 'Information_Groups_Json.json'
+    """
+
+    return path.strip('/').replace('/', '_') + '.json'
+
+
+def endpoint_class(path: str) -> str:
+    """
+    Groups a request path by endpoint, e.g. '/Hourly/MonitoringIndex/SiteCode=MY1/Json' -> '/Hourly/MonitoringIndex'
+    """
+
+    return '/' + '/'.join([part for part in path.strip('/').split('/') if '=' not in part and part.lower() != 'json'])
+
+
+def generate_reading(site_code: str, species_code: str, timestamp: datetime.datetime) -> str:
+    """
+    Generates a repeatable reading with a daily cycle for one site, species and hour. About 5% of hours are empty.
+
+    @return: The value as the API formats it, or '' for a missing hour
+    """
+
+    noise = zlib.crc32((site_code + species_code + str(timestamp)).encode()) / 0xffffffff
+    if noise < 0.05:
+        return ''
+    level = SPECIES_LEVELS.get(species_code.upper(), 10.0) * (1 + 0.5 * math.sin(2 * math.pi * (timestamp.hour - 8) / 24))
+    return str(round(level * (0.6 + 0.8 * noise), 1))
+
+
+def generate_hours(start_date: str, end_date: str):
+    start = datetime.datetime.fromisoformat(start_date)
+    end = datetime.datetime.fromisoformat(end_date)
+    while start < end:
+        yield start
+        start = start + datetime.timedelta(hours = 1)
+
+
+def load_site_species(site_code: str) -> list[str]:
+    """
+    Finds the species monitored at a site from its recorded hourly index, defaulting to NO2 for unrecorded sites
+    """
+
+    try:
+        with open(os.path.join(REPLAY_DIR, fixture_name('/Hourly/MonitoringIndex/SiteCode=' + site_code + '/Json'))) as fixture:
+            species = json.load(fixture)['HourlyAirQualityIndex']['LocalAuthority']['Site']['species']
+    except (OSError, KeyError, ValueError):
+        return ['NO2']
+    species = [species] if isinstance(species, dict) else species
+    return [entry['@SpeciesCode'] for entry in species]
+
+
+def build_response(path: str) -> dict|None:
+    """
+    Builds the json response for a request path
+
+    @param path: Request path relative to the API base, e.g. '/Information/Groups/Json'
+
+    @return: The response, or None if there is no recording for the path
+    """
+
+    match = SITE_SPECIES_DATA.match(path)
+    if match is not None:
+        site_code, species_code, start_date, end_date = match.groups()
+        return {'RawAQData': {'@SiteCode': site_code, '@SpeciesCode': species_code, 'Data': [
+            {'@MeasurementDateGMT': str(hour), '@Value': generate_reading(site_code, species_code, hour)} for hour in generate_hours(start_date, end_date)]}}
+    match = SITE_DATA.match(path)
+    if match is not None:
+        site_code, start_date, end_date = match.groups()
+        return {'AirQualityData': {'@SiteCode': site_code, 'Data': [
+            {'@SpeciesCode': species_code, '@MeasurementDateGMT': str(hour), '@Value': generate_reading(site_code, species_code, hour)}
+            for species_code in load_site_species(site_code) for hour in generate_hours(start_date, end_date)]}}
+    try:
+        with open(os.path.join(REPLAY_DIR, fixture_name(path))) as fixture:
+            return json.load(fixture)
+    except OSError:
+        return None
+
+
+class ReplayHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        path = self.path.split('?')[0]
+        if path.startswith(BASE_PATH):
+            path = path[len(BASE_PATH):]
+        server.count(path)
+
+        roll = server.random()
+        if roll < server.timeout_rate:
+            time.sleep(server.timeout_delay)
+        elif server.latency > 0 or server.jitter > 0:
+            time.sleep(max(0.0, server.latency + server.random_uniform(-server.jitter, server.jitter)))
+        if server.timeout_rate <= roll < server.timeout_rate + server.error_rate:
+            self.send_body(503, b'Service Unavailable', 'text/plain')
+            return
+
+        response = build_response(path)
+        if response is None:
+            self.send_body(404, b'Not Found', 'text/plain')
+        else:
+            self.send_body(200, json.dumps(response).encode(), 'application/json')
+
+    def send_body(self, status: int, body: bytes, content_type: str) -> None:
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            #the client gave up waiting, e.g. an injected timeout
+            pass
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ReplayServer(http.server.ThreadingHTTPServer):
+    """
+    Serves recorded London Air responses on a local port
+
+    @param port: Port to listen on, 0 picks a free port
+    @param latency: Seconds added to every response
+    @param jitter: Maximum random seconds added to or removed from the latency
+    @param error_rate: Fraction of requests answered with 503 Service Unavailable
+    @param timeout_rate: Fraction of requests held for timeout_delay seconds before answering
+    @param timeout_delay: Seconds a timed out request is held, longer than the client timeout
+    @param seed: Seed for the fault injection, for repeatable runs
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, port = 0, latency = 0.0, jitter = 0.0, error_rate = 0.0, timeout_rate = 0.0, timeout_delay = 35.0, seed = None, verbose = False):
+        super().__init__(('127.0.0.1', port), ReplayHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_delay = timeout_delay
+        self.verbose = verbose
+        self.request_counts = collections.Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return 'http://127.0.0.1:' + str(self.server_address[1]) + BASE_PATH
+
+    def count(self, path: str) -> None:
+        with self._lock:
+            self.request_counts[endpoint_class(path)] += 1
+
+    def random(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def random_uniform(self, lower: float, upper: float) -> float:
+        with self._lock:
+            return self._random.uniform(lower, upper)
+
+    def start(self) -> 'ReplayServer':
+        """
+        Serves requests on a background thread
+
+        @return: The server, so it can be started in the same expression it is created in
+        """
+
+        self._thread = threading.Thread(target = self.serve_forever, daemon = True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def record(paths: list[str], api_url = REMOTE_API_URL) -> None:
+    """
+    Downloads responses from the real London Air API into data/replay
+
+    @param paths: Request paths relative to the API base, e.g. '/Information/Groups/Json'
+    @param api_url: Base url of the API to record from
+    """
+
+    os.makedirs(REPLAY_DIR, exist_ok = True)
+    for path in paths:
+        with urllib.request.urlopen(api_url + path, timeout = 30) as response:
+            data = json.loads(response.read())
+        with open(os.path.join(REPLAY_DIR, fixture_name(path)), 'w') as fixture:
+            json.dump(data, fixture, indent = 1)
+        print('Recorded ' + path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Replay recorded London Air API responses')
+    parser.add_argument('--port', type = int, default = 8080)
+    parser.add_argument('--latency', type = float, default = 0.0)
+    parser.add_argument('--jitter', type = float, default = 0.0)
+    parser.add_argument('--error-rate', type = float, default = 0.0)
+    parser.add_argument('--timeout-rate', type = float, default = 0.0)
+    parser.add_argument('--seed', type = int, default = None)
+    parser.add_argument('--record', nargs = '+', metavar = 'PATH', help = 'record these paths from the real API instead of serving')
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record)
+    else:
+        server = ReplayServer(args.port, args.latency, args.jitter, args.error_rate, args.timeout_rate, seed = args.seed, verbose = True)
+        print('Replaying London Air API at ' + server.url)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
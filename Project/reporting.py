@@ -1,68 +1,85 @@
 # better variable names for month averages and day average (all round?)
 # fix global stations?
 import numpy as np
+import os
 import pandas as pd
 import typing as t
 
 from utils import *
+from instrumentation import instrument
 
+STATIONS = ('Marylebone Road', 'N. Kensington', 'Harlington')
+POLLUTANTS = ('no', 'pm10', 'pm25')
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+@instrument(memory = True)
+def load_data(stations = STATIONS) -> dict[str, pd.DataFrame]:
+    """
+    Reads the pollution data of each monitoring station from its csv file in the data directory
+
+    @param stations: Names of the monitoring stations to load
+
+    @return: A dictionary with stations as keys and corresponding raw data as values
+    """
+
+    return {station: pd.read_csv(os.path.join(DATA_DIR, 'Pollution-London ' + station.replace('.', '') + '.csv'), header = 0, na_values = 'No data') for station in stations}
+
+def get_timestamps(station_data: pd.DataFrame) -> np.ndarray:
+    """
+    Gets the hour each row of a station's data was measured at. Times are hour-ending, 01:00:00 to 24:00:00,
+    so 24:00:00 is midnight at the start of the next day.
+
+    @param station_data: Raw data of one monitoring station, as from load_data()
+
+    @return: A datetime64[h] array with one timestamp per row
+    """
+
+    #frames from dataset.py carry their typed timestamps, so the strings are not parsed again
+    if 'timestamp' in station_data:
+        return station_data['timestamp'].to_numpy(dtype = 'datetime64[h]')
+    days = station_data['date'].to_numpy().astype('datetime64[D]').astype('datetime64[h]')
+    return days + station_data['time'].str[:2].astype(int).to_numpy().astype('timedelta64[h]')
+
+def resample_station(data: dict[str, pd.DataFrame], monitoring_station: str, pollutant: str, frequency: str, statistic = 'mean') -> list[float]:
+    """
+    Resamples a station's readings of a pollutant on their timestamps (see resampling.py), so missing rows and data
+    from several years land in the right buckets
+
+    @param frequency: One of resampling.FREQUENCIES
+    @param statistic: One of resampling.STATISTICS
+
+    @return: The statistic of each bucket in time order, NaN for buckets with no values
+    """
+
+    import resampling
+
+    station_data = data[monitoring_station]
+    return resampling.resample(get_timestamps(station_data), station_data[pollutant].to_numpy(dtype = float), frequency, statistic)[1].tolist()
+
+@instrument()
 def daily_average(data: list[pd.DataFrame], monitoring_station: str, pollutant: str) -> list[float]:
 
-    averages = []
-    for day in [data[monitoring_station][pollutant][x:x+24] for x in range(0, len(data[monitoring_station][pollutant]), 24)]:
-        day = day[~np.isnan(day)]
-        if len(day) == 0:
-            averages.append(np.NAN)
-        else:
-            averages.append(meannvalue(list(day)))
-    return averages
+    return resample_station(data, monitoring_station, pollutant, 'daily', 'mean')
 
 
+@instrument()
 def daily_median(data: list[np.ndarray[np.void]], monitoring_station: str, pollutant: str) -> list[float]:
 
-    medians = []
-    
-    for day in [data[monitoring_station][pollutant][x:x+24] for x in range(0, len(data[monitoring_station][pollutant]), 24)]:
-        day = day[~np.isnan(day)]
-        if len(day) == 0:
-            medians.append(np.NAN)
-        else:
-            medians.append(np.median(list(day)))
-    return medians
+    return resample_station(data, monitoring_station, pollutant, 'daily', 'median')
 
+@instrument()
 def hourly_average(data: list[np.ndarray[np.void]], monitoring_station: str, pollutant: str) -> list[float]:
     
-    averages = []
-    
-    for hour in [data[monitoring_station][pollutant][x::24] for x in range(24)]:
-        hour = hour[~np.isnan(hour)]
-        if len(hour) == 0:
-            averages.append(np.NAN)
-        else:
-            averages.append(meannvalue(list(hour)))
-    return averages
+    #index 0 is the hour ending 01:00:00, index 23 the hour ending 24:00:00
+    return resample_station(data, monitoring_station, pollutant, 'hour_of_day', 'mean')
 
+@instrument()
 def monthly_average(data: list[np.ndarray[np.void]], monitoring_station: str, pollutant: str) -> list[float]:
 
-    averages = []
-    
-    #create a DataFrame of months only by slicing the dates in data
-    months_start = data[monitoring_station]['date'].str[5:7]
-    #create a DataFrame from the previous with True at an index if that inex matches the previous, False otherwise
-    months_start = months_start.eq(months_start.shift())
-    #create a list from the previous DataFrame of the indexes of all False values.
-    #this is a list of indexes of the begining of each month in the "date" column of the data DataFrame
-    months_start = [index for index, value in enumerate(months_start) if not value] + [None]
-
-    for month in [data[monitoring_station][pollutant][start:end] for start, end in zip(months_start, months_start[1:])]:
-        month = month[~np.isnan(month)]
-        if len(month) == 0:
-            averages.append(np.NAN)
-        else:
-            averages.append(meannvalue(list(month)))
-    return averages
+    return resample_station(data, monitoring_station, pollutant, 'monthly', 'mean')
 
 
+@instrument()
 def peak_hour_date(data: list[np.ndarray[np.void]], date: str, monitoring_station: str, pollutant: str) -> float|int:
 
     day_indexes = list(data[monitoring_station][data[monitoring_station]['date'] == date].index)
@@ -70,17 +87,19 @@ def peak_hour_date(data: list[np.ndarray[np.void]], date: str, monitoring_statio
     day = day[~np.isnan(day)]
     
     if len(day) == 0:
-        return(np.NAN)
+        return(np.nan)
     else:
         return(maxvalue(list(day)))
 
     
+@instrument()
 def count_missing_data(data: list[np.ndarray[np.void]], monitoring_station: str, pollutant: str) -> int:
     
     return(sum(data[monitoring_station][pollutant].isnull()))
 
 
+@instrument()
 def fill_missing_data(data: list[np.ndarray[np.void]], monitoring_station: str, pollutant: str, new_value: t.Any) -> list:
 
-    data[monitoring_station][pollutant] = data[monitoring_station][pollutant].replace(np.NAN, new_value)
+    data[monitoring_station][pollutant] = data[monitoring_station][pollutant].replace(np.nan, new_value)
     return (data)
@@ -0,0 +1,128 @@
+"""
+Timestamp-aware resampling of hourly readings into hourly, daily, weekly, monthly, quarterly or yearly buckets, or into an
+hour of day profile. Each reading is given the index of its bucket once, with integer arithmetic on its timestamp, and
+every statistic is then one grouped reduction over that index array (np.bincount, a ufunc .at or one sort), so missing
+rows, missing values and data spanning several years all land in the right bucket.
+
+Readings are hour-ending, as in the station csv files: the reading at 24:00:00 (midnight) covers 23:00 to 24:00 and
+belongs to the day before. Buckets are keyed on the start of each reading's hour.
+"""
+
+import numpy as np
+
+FREQUENCIES = ('hourly', 'daily', 'weekly', 'monthly', 'quarterly', 'yearly', 'hour_of_day')
+STATISTICS = ('mean', 'median', 'max', 'min', 'sum', 'count', 'missing')
+#1970-01-01 was a Thursday, weeks start on Monday
+_EPOCH_WEEKDAY = 3
+
+
+def bucket_index(timestamps: np.ndarray, frequency: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gives each reading the index of its bucket. Buckets run without gaps from the first reading's to the last's,
+    so buckets with no rows are kept (and reduce to NaN) rather than shifting later buckets.
+
+    @param timestamps: Hour-ending datetime64 timestamps of the readings, in any order
+    @param frequency: One of FREQUENCIES
+
+    @return: The start of each bucket as datetime64 (hours 0-23 for 'hour_of_day'), and the bucket index of each reading
+    """
+
+    if frequency not in FREQUENCIES:
+        raise ValueError('frequency must be one of ' + ', '.join(FREQUENCIES))
+    #the hour each reading started, so 24:00:00 readings fall in the day they were measured on
+    hours = timestamps.astype('datetime64[h]') - np.timedelta64(1, 'h')
+    if frequency == 'hour_of_day':
+        return np.arange(24), (hours.astype(np.int64) % 24).astype(np.intp)
+    if len(hours) == 0:
+        return np.array([], dtype = 'datetime64[h]'), np.array([], dtype = np.intp)
+
+    if frequency == 'hourly':
+        keys, unit, step = hours.astype(np.int64), 'h', 1
+    elif frequency == 'daily':
+        keys, unit, step = hours.astype('datetime64[D]').astype(np.int64), 'D', 1
+    elif frequency == 'weekly':
+        days = hours.astype('datetime64[D]').astype(np.int64)
+        keys, unit, step = days - (days + _EPOCH_WEEKDAY) % 7, 'D', 7
+    elif frequency == 'monthly':
+        keys, unit, step = hours.astype('datetime64[M]').astype(np.int64), 'M', 1
+    elif frequency == 'quarterly':
+        months = hours.astype('datetime64[M]').astype(np.int64)
+        keys, unit, step = months - months % 3, 'M', 3
+    else:
+        keys, unit, step = hours.astype('datetime64[Y]').astype(np.int64), 'Y', 1
+
+    first = keys.min()
+    index = ((keys - first) // step).astype(np.intp)
+    starts = (first + step * np.arange(index.max() + 1)).astype('datetime64[' + unit + ']')
+    return starts, index
+
+
+def grouped_reduce(values: np.ndarray, index: np.ndarray, buckets: int, statistic: str) -> np.ndarray:
+    """
+    Reduces the values in each bucket in one vectorised operation, ignoring NaN
+
+    @param values: Float readings
+    @param index: Bucket index of each reading, from bucket_index()
+    @param buckets: Number of buckets
+    @param statistic: One of STATISTICS. 'count' counts readings with a value, 'missing' counts NaN readings.
+
+    @return: One result per bucket, NaN for buckets with no values (except for 'sum', 'count' and 'missing', which are 0)
+    """
+
+    if statistic not in STATISTICS:
+        raise ValueError('statistic must be one of ' + ', '.join(STATISTICS))
+    values = np.asarray(values, dtype = float)
+    valid = ~np.isnan(values)
+    if statistic == 'missing':
+        return np.bincount(index[~valid], minlength = buckets)
+    index, values = index[valid], values[valid]
+    counts = np.bincount(index, minlength = buckets)
+    if statistic == 'count':
+        return counts
+    if statistic == 'sum':
+        return np.bincount(index, weights = values, minlength = buckets)
+
+    if statistic == 'mean':
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            result = np.bincount(index, weights = values, minlength = buckets) / counts
+    elif statistic == 'median':
+        #sorting by bucket then value puts each bucket's values in order, one after another
+        ordered = values[np.lexsort((values, index))]
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        filled = counts > 0
+        result = np.full(buckets, np.nan)
+        result[filled] = (ordered[starts[filled] + (counts[filled] - 1) // 2] + ordered[starts[filled] + counts[filled] // 2]) / 2
+    else:
+        reduce = np.maximum if statistic == 'max' else np.minimum
+        result = np.full(buckets, -np.inf if statistic == 'max' else np.inf)
+        reduce.at(result, index, values)
+    result[counts == 0] = np.nan
+    return result
+
+
+def resample(timestamps: np.ndarray, values: np.ndarray, frequency: str, statistic = 'mean') -> tuple[np.ndarray, np.ndarray]:
+    """
+    Resamples hourly readings into buckets
+
+    @param timestamps: Hour-ending datetime64 timestamps of the readings, in any order
+    @param values: Float readings, NaN if missing
+    @param frequency: One of FREQUENCIES
+    @param statistic: One of STATISTICS
+
+    @return: The start of each bucket, and the statistic of each bucket
+    """
+
+    starts, index = bucket_index(timestamps, frequency)
+    return starts, grouped_reduce(values, index, len(starts), statistic)
+
+
+def resample_many(timestamps: np.ndarray, values: np.ndarray, frequency: str, statistics = STATISTICS) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    Computes several statistics of the same readings, sharing one bucket index
+
+    @return: The start of each bucket, and a dictionary of one result array per statistic
+    """
+
+    starts, index = bucket_index(timestamps, frequency)
+    return starts, {statistic: grouped_reduce(values, index, len(starts), statistic) for statistic in statistics}
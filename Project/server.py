@@ -0,0 +1,213 @@
+"""
+Long-running HTTP server answering reporting and intelligence queries as JSON. Reporting queries are answered from the
+precomputed statistics cube (see cube.py), connected component detection runs on a pool of worker processes, and
+identical intelligence queries that arrive while one is already being answered share its result.
+
+Usage: python server.py [--port 8000] [--workers 4]
+
+Endpoints:
+    GET /health
+    GET /report/<statistic>?station=Marylebone Road&pollutant=no[&date=2021-01-01]
+        statistic is one of daily_average, daily_median, hourly_average, monthly_average, peak_hour_date, count_missing_data
+    GET /intelligence/pixels?colour=red[&upper=100&lower=50&map=map.png]
+    GET /intelligence/components?colour=red[&upper=100&lower=50&map=map.png]
+"""
+
+import argparse
+import concurrent.futures
+import http.server
+import json
+import os
+import threading
+import urllib.parse
+
+import cli
+
+DEFAULT_PORT = 8000
+
+
+def find_pixels(colour: str, upper: int, lower: int, map_filename: str) -> int:
+    """
+    Counts the pixels of a colour in a map. Runs in a worker process, so the greyscale image is not written, as workers
+    would overwrite each other's.
+    """
+
+    import intelligence
+
+    finder = intelligence.find_red_pixels if colour == 'red' else intelligence.find_cyan_pixels
+    return int(finder(map_filename, upper, lower, output = False).sum())
+
+
+def find_components(colour: str, upper: int, lower: int, map_filename: str) -> list[int]:
+    """
+    Finds the sizes of the connected components of a colour in a map, largest first. Runs in a worker process, so no
+    output files are written.
+    """
+
+    import intelligence
+
+    finder = intelligence.find_red_pixels if colour == 'red' else intelligence.find_cyan_pixels
+    return sorted(intelligence.get_component_sizes(intelligence.detect_connected_components(finder(map_filename, upper, lower, output = False), output = False)), reverse = True)
+
+
+class QueryError(Exception):
+    """
+    Raised for a query that cannot be answered, answered with 400 Bad Request
+    """
+
+
+class QueryServer(http.server.ThreadingHTTPServer):
+    """
+    Serves reporting and intelligence queries
+
+    @param port: Port to listen on, 0 picks a free port
+    @param workers: Number of worker processes for intelligence queries, defaults to the number of CPUs
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, port = DEFAULT_PORT, workers = None, host = '127.0.0.1'):
+        import cube
+        import reporting
+
+        super().__init__((host, port), QueryHandler)
+        self.reporting = reporting
+        #reporting queries are slices of the precomputed statistics cube, the csv files are only read if it is out of date
+        self.cube = cube.get_cube(reporting.STATIONS)
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers = workers)
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
+        self.coalesced = 0
+
+    def coalesce(self, key: tuple, compute):
+        """
+        Answers a query, sharing the answer with identical queries that arrive while it is being computed
+
+        @param key: Identifies the query
+        @param compute: A function with no arguments that answers the query
+
+        @return: The answer
+        """
+
+        with self.inflight_lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self.inflight[key] = future
+            else:
+                self.coalesced += 1
+        if leader:
+            try:
+                future.set_result(compute())
+            except Exception as error:
+                future.set_exception(error)
+            finally:
+                with self.inflight_lock:
+                    del self.inflight[key]
+        return future.result()
+
+    def report(self, statistic: str, query: dict) -> dict:
+        if statistic not in cli.REPORT_STATISTICS:
+            raise QueryError('unknown statistic ' + statistic + '. Choose from ' + ', '.join(cli.REPORT_STATISTICS))
+        try:
+            station = cli.match_names([query.get('station', '')], self.reporting.STATIONS)[0]
+            pollutant = cli.match_names([query.get('pollutant', '')], self.reporting.POLLUTANTS)[0]
+        except cli.CLIError as error:
+            raise QueryError(str(error))
+        if statistic == 'peak_hour_date' and 'date' not in query:
+            raise QueryError('peak_hour_date needs a date')
+        try:
+            value = self.cube.answer(statistic, station, pollutant, query.get('date'))
+        except (IndexError, ValueError):
+            raise QueryError('there is no data for ' + query.get('date', ''))
+        value = [cli.to_json_value(item) for item in value] if isinstance(value, list) else cli.to_json_value(value)
+        return {'station': station, 'pollutant': pollutant, 'statistic': statistic, 'date': query.get('date'), 'value': value}
+
+    def intelligence(self, action: str, query: dict) -> dict:
+        colour = query.get('colour', 'red')
+        if colour not in ('red', 'cyan') or action not in ('pixels', 'components'):
+            raise QueryError('expected /intelligence/pixels or /intelligence/components with colour red or cyan')
+        try:
+            upper = int(query.get('upper', 100))
+            lower = int(query.get('lower', 50))
+        except ValueError:
+            raise QueryError('thresholds must be integers between 0 and 255')
+        if not (0 <= upper <= 255 and 0 <= lower <= 255):
+            raise QueryError('thresholds must be integers between 0 and 255')
+        map_filename = query.get('map', 'map.png')
+        #maps are only read from the data directory
+        if os.path.basename(map_filename) != map_filename or map_filename in ('', '.', '..') or not os.path.isfile(os.path.join(self.reporting.DATA_DIR, map_filename)):
+            raise QueryError('map ' + map_filename + ' could not be found')
+        worker = find_pixels if action == 'pixels' else find_components
+        try:
+            result = self.coalesce(('intelligence', action, colour, upper, lower, map_filename),
+            lambda: self.pool.submit(worker, colour, upper, lower, map_filename).result())
+        except FileNotFoundError:
+            raise QueryError('map ' + map_filename + ' could not be found')
+        answer = {'colour': colour, 'upper': upper, 'lower': lower, 'map': map_filename}
+        if action == 'pixels':
+            return {**answer, 'pixels': result}
+        return {**answer, 'components': len(result), 'component_sizes': result}
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures = True)
+
+
+class QueryHandler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    #headers and body are written separately, so without this Nagle's algorithm holds back the body of each keep-alive
+    #response until the client's delayed ACK arrives
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if part]
+        try:
+            if parts == ['health']:
+                answer = {'status': 'ok', 'coalesced': self.server.coalesced}
+            elif len(parts) == 2 and parts[0] == 'report':
+                answer = self.server.report(parts[1], query)
+            elif len(parts) == 2 and parts[0] == 'intelligence':
+                answer = self.server.intelligence(parts[1], query)
+            else:
+                self.send_json(404, {'error': 'not found'})
+                return
+        except QueryError as error:
+            self.send_json(400, {'error': str(error)})
+            return
+        except Exception as error:
+            self.send_json(500, {'error': str(error)})
+            return
+        self.send_json(200, answer)
+
+    def send_json(self, status: int, answer: dict) -> None:
+        body = json.dumps(answer).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Serve reporting and intelligence queries as JSON over HTTP')
+    parser.add_argument('--port', type = int, default = DEFAULT_PORT)
+    parser.add_argument('--workers', type = int, default = None, help = 'worker processes for intelligence queries')
+    args = parser.parse_args()
+
+    server = QueryServer(args.port, args.workers)
+    print('Serving on http://127.0.0.1:' + str(server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,211 @@
+"""
+Joins the connected components found on the city map by intelligence.py to London Air monitoring sites. Map pixels are
+georeferenced to latitude and longitude from the map's bounds, component centroids are found with one np.bincount pass
+over the component labels, and a uniform grid index over the sites answers nearest-k queries by searching outwards from
+the query's cell, so each query only looks at the sites in a few nearby cells.
+
+Usage: python spatial.py [--colour red] [--nearest 3] [--group London] [--bounds WEST SOUTH EAST NORTH]
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+
+import numpy as np
+
+#longitude and latitude of the edges of data/map.png, as west, south, east, north. The map has no georeference, so these
+#are an assumed fit to the area it shows (Marylebone and Regent's Park) and positions are approximate. Can be overridden with the AQ_MAP_BOUNDS environment variable, e.g. AQ_MAP_BOUNDS=-0.178,51.507,-0.133,51.5355
+MAP_BOUNDS = tuple(float(edge) for edge in os.environ.get('AQ_MAP_BOUNDS', '-0.178,51.507,-0.133,51.5355').split(','))
+EARTH_RADIUS = 6371000.0
+#average number of sites per grid cell when the cell size is chosen from the sites' density
+SITES_PER_CELL = 2
+
+
+def pixels_to_coordinates(rows: np.ndarray, columns: np.ndarray, shape: tuple[int, int], bounds = MAP_BOUNDS) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Converts pixel positions on the map to latitude and longitude, treating the map as a linear latitude/longitude grid,
+    which is accurate to a few metres over a city-sized map
+
+    @param rows: Row of each pixel, may be fractional (e.g. a centroid)
+    @param columns: Column of each pixel, may be fractional
+    @param shape: (height, width) of the map in pixels
+    @param bounds: Longitude and latitude of the map's edges as (west, south, east, north)
+
+    @return: The latitude and longitude of each pixel's centre
+    """
+
+    west, south, east, north = bounds
+    latitudes = north - (np.asarray(rows, dtype = float) + 0.5) / shape[0] * (north - south)
+    longitudes = west + (np.asarray(columns, dtype = float) + 0.5) / shape[1] * (east - west)
+    return latitudes, longitudes
+
+
+def component_centroids(mark: np.ndarray, gs_img: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Finds the centroid and pixel count of every connected component in one pass over the labels
+
+    @param mark: Component labels in mark[:, :, 0], as from intelligence.detect_connected_components()
+    @param gs_img: The binary image the components were found in. Only its white pixels are counted, as
+    detect_connected_components() also writes component sizes over the first labels of mark.
+
+    @return: Arrays 'label', 'pixels', 'row' and 'column' with one entry per component
+    """
+
+    labels = mark[:, :, 0] if mark.ndim == 3 else mark
+    labels = np.where(gs_img, labels, 0).ravel().astype(np.intp)
+    rows, columns = np.divmod(np.arange(labels.size), mark.shape[1])
+    pixels = np.bincount(labels)
+    row_sums = np.bincount(labels, weights = rows)
+    column_sums = np.bincount(labels, weights = columns)
+    #label 0 is the background
+    found = np.flatnonzero(pixels[1:]) + 1
+    return {'label': found, 'pixels': pixels[found], 'row': row_sums[found] / pixels[found], 'column': column_sums[found] / pixels[found]}
+
+
+def project(latitudes, longitudes, reference_latitude: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Projects latitude and longitude to metres east and north with an equirectangular projection about a reference latitude
+    """
+
+    scale = math.cos(math.radians(reference_latitude))
+    x = np.radians(np.asarray(longitudes, dtype = float)) * EARTH_RADIUS * scale
+    y = np.radians(np.asarray(latitudes, dtype = float)) * EARTH_RADIUS
+    return x, y
+
+
+class SiteIndex:
+    """
+    Uniform grid index over monitoring sites for nearest-k queries. Distances are in metres on an equirectangular projection,
+    accurate to well under 1% across London.
+
+    @param sites: Records with 'SiteCode', 'SiteName', 'Latitude' and 'Longitude' keys, as from load_sites()
+    @param cell_size: Width of each grid cell in metres. By default it is chosen so a cell holds SITES_PER_CELL sites on average.
+    """
+
+    def __init__(self, sites: list[dict], cell_size = None):
+        self.sites = list(sites)
+        latitudes = np.array([float(site['Latitude']) for site in self.sites])
+        longitudes = np.array([float(site['Longitude']) for site in self.sites])
+        self.reference_latitude = float(latitudes.mean()) if len(self.sites) > 0 else 51.5
+        self.x, self.y = project(latitudes, longitudes, self.reference_latitude)
+        if cell_size is None:
+            area = (np.ptp(self.x) * np.ptp(self.y)) if len(self.sites) > 1 else 0.0
+            cell_size = max(math.sqrt(area * SITES_PER_CELL / len(self.sites)), 1.0) if area > 0 else 1000.0
+        self.cell_size = cell_size
+        #plain lists are much faster than NumPy arrays to index one site at a time
+        self.points = list(zip(self.x.tolist(), self.y.tolist()))
+        self.cells = {}
+        for n, (x, y) in enumerate(self.points):
+            self.cells.setdefault((math.floor(x / cell_size), math.floor(y / cell_size)), []).append(n)
+        cell_x, cell_y = zip(*self.cells) if len(self.cells) > 0 else ((0,), (0,))
+        self.cell_bounds = (min(cell_x), min(cell_y), max(cell_x), max(cell_y))
+
+    def nearest(self, latitude: float, longitude: float, k = 1) -> list[tuple[int, float]]:
+        """
+        Finds the k nearest sites to a point by searching rings of grid cells outwards from the point's cell, stopping once
+        no unsearched cell can hold a nearer site than the kth found
+
+        @return: (site position in self.sites, distance in metres) of the nearest sites, nearest first
+        """
+
+        x, y = project(latitude, longitude, self.reference_latitude)
+        x, y = float(x), float(y)
+        cell_x, cell_y = math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+        if len(self.cells) == 0:
+            return []
+        #no site lies further than this many rings out, as the ring reaches the far corner of the occupied cells
+        min_x, min_y, max_x, max_y = self.cell_bounds
+        max_ring = max(abs(cell_x - min_x), abs(cell_x - max_x), abs(cell_y - min_y), abs(cell_y - max_y))
+        best = []
+        points = self.points
+        cells = self.cells
+        for ring in range(max_ring + 1):
+            for cell in self._ring(cell_x, cell_y, ring):
+                for n in cells.get(cell, ()):
+                    distance = math.hypot(points[n][0] - x, points[n][1] - y)
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, n))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, n))
+            #every cell outside this ring is at least ring cells away from the query's cell
+            if len(best) == k and -best[0][0] <= ring * self.cell_size:
+                break
+        return [(n, -distance) for distance, n in sorted(best, reverse = True)]
+
+    @staticmethod
+    def _ring(cell_x: int, cell_y: int, ring: int):
+        if ring == 0:
+            yield (cell_x, cell_y)
+            return
+        for dx in range(-ring, ring + 1):
+            yield (cell_x + dx, cell_y - ring)
+            yield (cell_x + dx, cell_y + ring)
+        for dy in range(-ring + 1, ring):
+            yield (cell_x - ring, cell_y + dy)
+            yield (cell_x + ring, cell_y + dy)
+
+
+def load_sites(group_name = 'London', include_closed = False) -> list[dict]:
+    """
+    Gets the monitoring sites of a group that have coordinates from /Information/MonitoringSites
+
+    @param group_name: The name of a group of pollution monitoring sites
+    @param include_closed: If True, sites that have closed are included
+
+    @return: One record per site with 'SiteCode', 'SiteName', 'Latitude' and 'Longitude'
+    """
+
+    import monitoring
+
+    sites = monitoring.unpack_json(monitoring.get_live_data_from_api('/Information/MonitoringSites/GroupName={group_name}/Json', group_name = group_name), ['Sites', 'Site'])
+    if sites is None:
+        return []
+    if not include_closed:
+        sites = sites.loc[sites['DateClosed'] == '']
+    sites = sites.loc[(sites['Latitude'] != '') & (sites['Longitude'] != '')]
+    return sites[['SiteCode', 'SiteName', 'Latitude', 'Longitude']].to_dict('records')
+
+
+def join_components_to_sites(mark: np.ndarray, gs_img: np.ndarray, index: SiteIndex, k = 1, bounds = MAP_BOUNDS) -> list[dict]:
+    """
+    Finds the nearest monitoring sites to the centroid of every connected component on the map
+
+    @param mark: Component labels, as from intelligence.detect_connected_components()
+    @param gs_img: The binary image the components were found in, see component_centroids()
+    @param index: Index over the monitoring sites
+    @param k: Number of nearest sites to find per component
+    @param bounds: Longitude and latitude of the map's edges as (west, south, east, north)
+
+    @return: One record per component with its label, pixel count, centroid coordinates and nearest sites
+    """
+
+    centroids = component_centroids(mark, gs_img)
+    latitudes, longitudes = pixels_to_coordinates(centroids['row'], centroids['column'], mark.shape[:2], bounds)
+    records = []
+    for n in range(len(centroids['label'])):
+        nearest = index.nearest(latitudes[n], longitudes[n], k)
+        records.append({'label': int(centroids['label'][n]), 'pixels': int(centroids['pixels'][n]), 'latitude': round(float(latitudes[n]), 6),
+        'longitude': round(float(longitudes[n]), 6), 'nearest_sites': [{'site_code': index.sites[site]['SiteCode'],
+        'site_name': index.sites[site]['SiteName'], 'distance_m': round(distance, 1)} for site, distance in nearest]})
+    return records
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Find the monitoring sites nearest each connected component on the map')
+    parser.add_argument('--map', default = 'map.png')
+    parser.add_argument('--colour', choices = ('red', 'cyan'), default = 'red')
+    parser.add_argument('--upper', type = int, default = 100)
+    parser.add_argument('--lower', type = int, default = 50)
+    parser.add_argument('--nearest', type = int, default = 1, help = 'sites to find per component')
+    parser.add_argument('--group', default = 'London', help = 'monitoring site group')
+    parser.add_argument('--bounds', type = float, nargs = 4, default = MAP_BOUNDS, metavar = ('WEST', 'SOUTH', 'EAST', 'NORTH'))
+    args = parser.parse_args()
+
+    import intelligence
+
+    finder = intelligence.find_red_pixels if args.colour == 'red' else intelligence.find_cyan_pixels
+    gs_img = finder(args.map, args.upper, args.lower)
+    records = join_components_to_sites(intelligence.detect_connected_components(gs_img), gs_img, SiteIndex(load_sites(args.group)), args.nearest, tuple(args.bounds))
+    print(json.dumps(records, indent = 1))
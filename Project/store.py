@@ -0,0 +1,138 @@
+import datetime
+import os
+import sqlite3
+import threading
+
+STORE_PATH = os.path.join(os.path.dirname(__file__), 'cache', 'timeseries.sqlite')
+
+_local = threading.local()
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Opens the local time-series store, creating its tables on first use. Each thread gets its own connection.
+
+    The store holds one row per site, species and hour in readings, and the date intervals that have been fully
+    downloaded for each site and species in coverage, so gaps can be told apart from hours the API had no value for.
+
+    @return: A connection to the SQLite database at STORE_PATH
+    """
+
+    connection = getattr(_local, 'connection', None)
+    if connection is not None and _local.path == STORE_PATH:
+        return connection
+    os.makedirs(os.path.dirname(STORE_PATH), exist_ok = True)
+    connection = sqlite3.connect(STORE_PATH, timeout = 30)
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute('''CREATE TABLE IF NOT EXISTS readings (
+        site_code TEXT NOT NULL, species_code TEXT NOT NULL, hour TEXT NOT NULL, value REAL,
+        PRIMARY KEY (site_code, species_code, hour)) WITHOUT ROWID''')
+    connection.execute('''CREATE TABLE IF NOT EXISTS coverage (
+        site_code TEXT NOT NULL, species_code TEXT NOT NULL, start_date TEXT NOT NULL, end_date TEXT NOT NULL)''')
+    connection.execute('CREATE INDEX IF NOT EXISTS coverage_site_species ON coverage (site_code, species_code)')
+    connection.commit()
+    _local.connection = connection
+    _local.path = STORE_PATH
+    return connection
+
+
+def get_coverage(site_code: str, species_code: str) -> list[tuple[datetime.date, datetime.date]]:
+    """
+    Gets the date intervals already downloaded for a site and species
+
+    @param site_code: A code corresponding to a pollution monitoring site
+    @param species_code: A code corresponding to a monitored pollutant
+
+    @return: Non-overlapping (start, end) intervals in time order. Each end date is exclusive.
+    """
+
+    rows = get_connection().execute('SELECT start_date, end_date FROM coverage WHERE site_code = ? AND species_code = ? ORDER BY start_date',
+    (site_code, species_code)).fetchall()
+    return [(datetime.date.fromisoformat(start), datetime.date.fromisoformat(end)) for start, end in rows]
+
+
+def missing_intervals(site_code: str, species_code: str, start_date: datetime.date, end_date: datetime.date) -> list[tuple[datetime.date, datetime.date]]:
+    """
+    Finds the parts of a date range that are not yet in the store
+
+    @param site_code: A code corresponding to a pollution monitoring site
+    @param species_code: A code corresponding to a monitored pollutant
+    @param start_date: Start of the requested range
+    @param end_date: End of the requested range (exclusive)
+
+    @return: (start, end) intervals that need to be fetched, in time order
+    """
+
+    missing = []
+    cursor = start_date
+    for covered_start, covered_end in get_coverage(site_code, species_code):
+        if covered_end <= cursor:
+            continue
+        if covered_start >= end_date:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+    if cursor < end_date:
+        missing.append((cursor, end_date))
+    return missing
+
+
+def save_readings(site_code: str, species_code: str, data, covered: list[tuple[datetime.date, datetime.date]]) -> None:
+    """
+    Merges downloaded readings into the store and records the intervals they cover.
+    Days from today onwards are never recorded as covered, because the API is still adding readings for them.
+
+    @param site_code: A code corresponding to a pollution monitoring site
+    @param species_code: A code corresponding to a monitored pollutant
+    @param data: DataFrame of MeasurementDateGMT and Value strings, as returned by monitoring.fetch_site_species()
+    @param covered: (start, end) intervals that were downloaded in full
+    """
+
+    import math
+    import pandas as pd
+
+    connection = get_connection()
+    values = pd.to_numeric(pd.Series(data['Value'], dtype = object), errors = 'coerce').tolist()
+    rows = [(site_code, species_code, hour, None if math.isnan(value) else value) for hour, value in zip(data['MeasurementDateGMT'], values)]
+    today = datetime.date.today()
+    with connection:
+        connection.executemany('INSERT OR REPLACE INTO readings VALUES (?, ?, ?, ?)', rows)
+        intervals = get_coverage(site_code, species_code) + [(start, min(end, today)) for start, end in covered if start < min(end, today)]
+        connection.execute('DELETE FROM coverage WHERE site_code = ? AND species_code = ?', (site_code, species_code))
+        connection.executemany('INSERT INTO coverage VALUES (?, ?, ?, ?)',
+        [(site_code, species_code, start.isoformat(), end.isoformat()) for start, end in merge_intervals(intervals)])
+
+
+def merge_intervals(intervals: list[tuple]) -> list[tuple]:
+    """
+    Merges overlapping or touching intervals
+
+    @param intervals: (start, end) intervals in any order
+
+    @return: Non-overlapping (start, end) intervals in time order
+    """
+
+    merged = []
+    for start, end in sorted(intervals):
+        if len(merged) > 0 and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def load_readings(site_code: str, species_code: str, start_date: datetime.date, end_date: datetime.date) -> list[tuple[str, float|None]]:
+    """
+    Reads stored readings for a site and species
+
+    @param site_code: A code corresponding to a pollution monitoring site
+    @param species_code: A code corresponding to a monitored pollutant
+    @param start_date: Start of the requested range
+    @param end_date: End of the requested range (exclusive)
+
+    @return: (MeasurementDateGMT, value) pairs in time order. Hours without a value have None.
+    """
+
+    return get_connection().execute('SELECT hour, value FROM readings WHERE site_code = ? AND species_code = ? AND hour >= ? AND hour < ? ORDER BY hour',
+    (site_code, species_code, start_date.isoformat(), end_date.isoformat())).fetchall()